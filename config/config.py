@@ -13,15 +13,59 @@ DB_CONFIG = {
     "user": os.getenv("DB_USER", "postgres"),
     "password": os.getenv("DB_PASSWORD", "postgres")
 }
+DB_POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN_CONN", "2"))
+DB_POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX_CONN", "16"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
 
 # Model configurations
 CAPTION_MODEL_ID = "nlpconnect/vit-gpt2-image-captioning"
 ASR_MODEL_ID = "facebook/wav2vec2-base-960h"
-EMBEDDING_MODEL_ID = "sentence-transformers/all-MiniLM-L6-v2"
+# Any SentenceTransformer checkpoint with EMBEDDING_DIM outputs, e.g. a static
+# model2vec/potion export for much faster CPU encoding
+EMBEDDING_MODEL_ID = os.getenv("EMBEDDING_MODEL_ID", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DIM = 384  # must match highlights.embedding
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_CACHE_SIZE = 4096
+
+# Query caching
+QUERY_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.97
+SEMANTIC_CACHE_SIZE = 1024
+SEMANTIC_CACHE_TTL = 600  # seconds
+SUMMARY_CACHE_TTL = 300  # seconds
+RESPONSE_CACHE_SIZE = 256
+
+# Local query routing: answer without Gemini when the nearest labeled example is
+# this similar and beats the runner-up label by the margin
+LOCAL_CLASSIFIER_THRESHOLD = 0.6
+LOCAL_CLASSIFIER_MARGIN = 0.08
+
+# Prompt size limits (characters)
+PROMPT_DESCRIPTION_CHARS = 200
+SUMMARY_SECTION_CHARS = 3000
+
+DEVICE = "cuda" if os.getenv("USE_CUDA", "false").lower() == "true" else "cpu"
 
 # Video processing
 N_FRAMES = 29
-DEVICE = "cuda" if os.getenv("USE_CUDA", "false").lower() == "true" else "cpu"
+# Frames per caption batch; halved automatically on CUDA out-of-memory
+CAPTION_BATCH_SIZE = int(os.getenv("CAPTION_BATCH_SIZE", "32" if DEVICE == "cuda" else "8"))
+ENCODER_CACHE_SIZE = int(os.getenv("ENCODER_CACHE_SIZE", "512"))  # frames
+ENCODER_CACHE_TTL = 3600  # seconds
+
+# Audio processing
+ASR_CHUNK_LENGTH_S = 30
+ASR_STRIDE_LENGTH_S = 2.5  # overlap cropped from each side of a chunk
+ASR_BATCH_SIZE = 8
+# "transformers" (ASR_MODEL_ID via HF pipeline) or "faster-whisper" (CTranslate2, VAD chunking)
+ASR_BACKEND = os.getenv("ASR_BACKEND", "transformers")
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "base")
+# Directory of an ONNX export of ASR_MODEL_ID (optimum-cli export onnx); requires optimum[onnxruntime]
+ASR_ONNX_DIR = os.getenv("ASR_ONNX_DIR")
+QUANTIZE = os.getenv("QUANTIZE", "0") == "1"  # int8 dynamic quantization (CPU only)
+# Intra-op threads per worker process on CPU; the video and audio workers split the cores
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", str(max(1, (os.cpu_count() or 2) // 2))))
 
 # API configuration
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
@@ -48,7 +48,7 @@ def show_database_results(db_manager: DatabaseManager, video_id: int):
     audio_table.add_column("Transcription", style="green")
     
     # Query database for highlights
-    with db_manager.conn.cursor() as cur:
+    with db_manager.get_conn() as conn, conn.cursor() as cur:
         # Get visual highlights (no end_timestamp)
         cur.execute("""
             SELECT timestamp, description FROM highlights 
@@ -146,15 +146,7 @@ def process_video_demo(video_path: str):
         video_id = db_manager.insert_video(os.path.basename(video_path), video_data["duration"])
         progress.update(store_task, advance=25)
         
-        for highlight in highlights:
-            db_manager.insert_highlight(
-                video_id=video_id,
-                timestamp=highlight["timestamp"],
-                description=highlight["description"],
-                summary=highlight["summary"],
-                embedding=highlight["embedding"],
-                end_timestamp=highlight.get("end_timestamp")
-            )
+        db_manager.insert_highlights_bulk(video_id, highlights)
         progress.update(store_task, advance=50)
         
         # Generate and store summary
@@ -173,7 +165,7 @@ def demo_queries(video_id: int, gemini_chat: GeminiChat, highlight_extractor: Hi
     print_step(6, "Testing Intelligent Query System")
     
     # Initialize query classifier
-    query_classifier = QueryClassifier(gemini_chat)
+    query_classifier = QueryClassifier(gemini_chat, highlight_extractor.get_embeddings)
     
     # Test different query types
     test_queries = [
@@ -187,11 +179,11 @@ def demo_queries(video_id: int, gemini_chat: GeminiChat, highlight_extractor: Hi
         console.print(f"\n[bold cyan]Query {i}:[/bold cyan] {query}")
         
         # Classify query
-        data_type = query_classifier.classify_query(query)
+        query_embedding = highlight_extractor.get_embedding(query)
+        data_type = query_classifier.classify_query(query, query_embedding)
         console.print(f"[yellow]→ Classified as:[/yellow] {data_type}")
         
         # Get results based on classification
-        query_embedding = highlight_extractor.get_embedding(query)
         
         if data_type == "visual":
             results = db_manager.search_visual_highlights(query_embedding, limit=2)
@@ -212,12 +204,13 @@ def demo_queries(video_id: int, gemini_chat: GeminiChat, highlight_extractor: Hi
             console.print("[red]→ No relevant results found[/red]")
 
 def main():
-    if len(sys.argv) != 2:
+    if len(sys.argv) not in (2, 3):
         console.print("[red]Please provide a video file path as argument[/red]")
-        console.print("Usage: python demo.py path/to/video.mp4")
+        console.print("Usage: python demo.py path/to/video.mp4 [highlights.csv]")
         sys.exit(1)
     
     video_path = sys.argv[1]
+    dump_path = sys.argv[2] if len(sys.argv) == 3 else None
     
     if not os.path.exists(video_path):
         console.print(f"[red]Video file not found: {video_path}[/red]")
@@ -232,6 +225,12 @@ def main():
         # Demo queries
         demo_queries(video_id, gemini_chat, highlight_extractor, db_manager)
         
+        # Optionally dump every stored highlight for this video
+        if dump_path:
+            with open(dump_path, "w", newline="") as f:
+                db_manager.export_highlights_csv(f, video_id)
+            console.print(f"[green]Highlights exported to {dump_path}[/green]")
+        
         console.print(Panel(
             "[bold green]✅ Demo completed successfully![/bold green]\n"
             "The video has been processed and stored in the database.\n"
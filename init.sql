@@ -16,6 +16,6 @@ CREATE TABLE IF NOT EXISTS highlights (
     timestamp FLOAT NOT NULL,
     description TEXT NOT NULL,
     summary TEXT,
-    embedding vector(384),  -- Dimension spécifique pour all-MiniLM-L6-v2
+    embedding halfvec(384),  -- Dimension spécifique pour all-MiniLM-L6-v2 (fp16)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 ); 
\ No newline at end of file
@@ -1,19 +1,25 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import shutil
 from pathlib import Path
 import os
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
+import json
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-from src.processors.video_processor import VideoProcessor
-from src.processors.audio_processor import AudioProcessor
+from src.processors import workers
 from src.llm.highlight_extractor import HighlightExtractor
-from src.llm.gemini_chat import GeminiChat
+from src.llm.gemini_chat import GeminiChat, RESPONSE_ERROR
 from src.database.db_manager import DatabaseManager
 from config.config import VIDEOS_DIR, GEMINI_API_KEY
 from src.llm.query_classifier import QueryClassifier
+from src.llm.semantic_cache import SemanticCache
 
 app = FastAPI(title="Video Chat API")
 
@@ -26,216 +32,343 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize components
-video_processor = VideoProcessor()
-audio_processor = AudioProcessor()
+# Initialize components (video/audio models live in the worker processes)
 highlight_extractor = HighlightExtractor()
 db_manager = DatabaseManager()
 gemini_chat = GeminiChat(GEMINI_API_KEY)
+query_classifier = QueryClassifier(gemini_chat, highlight_extractor.get_embeddings)
+chat_cache = SemanticCache()
 
 # Ensure videos directory exists
 VIDEOS_DIR.mkdir(exist_ok=True)
 
+# Worker processes for the GIL-heavy video and audio pipelines, by pipeline name
+WORKER_INITIALIZERS = {"video": workers.init_video_worker, "audio": workers.init_audio_worker}
+worker_pools = {}
+worker_warmups = {}
+worker_pools_lock = threading.Lock()
+
+# Serializes the busy check, data wipe and job insert of concurrent uploads
+upload_lock = asyncio.Lock()
+
 class ChatQuery(BaseModel):
     query: str
 
+@app.on_event("startup")
+def recover_interrupted_videos():
+    """Fail jobs a crash or restart cut short, so they don't block uploads and chat forever"""
+    interrupted = db_manager.fail_interrupted_videos()
+    if interrupted:
+        print(f"Marked {interrupted} interrupted video(s) as failed")
+
+def start_worker(name: str):
+    """(Re)start the persistent worker process of a pipeline and begin loading its models"""
+    with worker_pools_lock:
+        old_pool = worker_pools.get(name)
+        if old_pool:
+            old_pool.shutdown(wait=False, cancel_futures=True)
+        pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=WORKER_INITIALIZERS[name])
+        worker_pools[name] = pool
+        # models_ready() reports False until the new process has loaded its models
+        worker_warmups[name] = pool.submit(workers.ping)
+
+@app.on_event("startup")
+def start_workers():
+    """Start one persistent worker process per pipeline and load their models"""
+    for name in WORKER_INITIALIZERS:
+        start_worker(name)
+
+@app.on_event("startup")
+def warm_up_models():
+    """Run one dummy embedding so the first chat request doesn't pay for lazy initialization"""
+    highlight_extractor.get_embeddings(["warmup"])
+
+def models_ready() -> bool:
+    """Check whether both worker processes have loaded their models"""
+    return len(worker_warmups) == len(WORKER_INITIALIZERS) and all(
+        f.done() and f.exception() is None and f.result() for f in worker_warmups.values()
+    )
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "models_ready": video_processor.is_ready and audio_processor.is_ready
+        "models_ready": models_ready()
     }
 
-def process_video_parallel(video_path: str) -> dict:
-    """Process video and audio in parallel"""
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        # Start both tasks
-        video_future = executor.submit(video_processor.process_video, video_path)
-        audio_future = executor.submit(audio_processor.process_audio, video_path)
-        
-        # Get results
-        video_data = video_future.result()
-        audio_data = audio_future.result()
-        
-        # Combine results - audio_processor returns {"text": "...", "words": [...]}
-        video_data["audio_transcription"] = audio_data
-        
-        print(f"DEBUG: Audio data received: {audio_data}")
-        print(f"DEBUG: Combined video_data keys: {video_data.keys()}")
-        
-        return video_data
+def submit_to_worker(name: str, fn, *args) -> Future:
+    """Run fn on a pipeline's worker process, restarting the worker if it has died"""
+    try:
+        return worker_pools[name].submit(fn, *args)
+    except BrokenProcessPool:
+        restart_dead_worker(name)
+        raise
 
-@app.post("/upload")
-async def upload_video(file: UploadFile = File(...)):
-    """Upload and process a video file"""
-    if not video_processor.is_ready or not audio_processor.is_ready:
-        raise HTTPException(
-            status_code=503,
-            detail="Service is starting up. Models are still being loaded. Please try again in a moment."
-        )
+def worker_result(name: str, future: Future):
+    """Wait for a worker task, restarting the worker if it died running it"""
+    try:
+        return future.result()
+    except BrokenProcessPool:
+        restart_dead_worker(name)
+        raise
+
+def restart_dead_worker(name: str):
+    """Replace a worker whose process died: a broken pool refuses every later task"""
+    print(f"The {name} worker process died; restarting it")
+    start_worker(name)
+
+def process_video_parallel(video_path: str) -> dict:
+    """Process video and audio in parallel on separate worker processes"""
+    # Start both tasks
+    video_future = submit_to_worker("video", workers.process_video, video_path)
+    audio_future = submit_to_worker("audio", workers.process_audio, video_path)
     
+    # Get results
+    video_data = worker_result("video", video_future)
+    audio_data = worker_result("audio", audio_future)
+    
+    # Combine results - audio_processor returns {"text": "...", "words": [...]}
+    video_data["audio_transcription"] = audio_data
+    
+    return video_data
+
+def run_pipeline(video_path: str, video_id: int):
+    """Run the full ingestion pipeline for an uploaded video, recording status transitions"""
     try:
-        print("Starting video upload...")
-        
-        # Clear previous data before processing new video
-        print("Clearing previous video data...")
-        db_manager.clear_all_data()
-        
-        # Save video file
-        video_path = VIDEOS_DIR / file.filename
-        print(f"Saving video to {video_path}")
-        with video_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        db_manager.set_video_status(video_id, "processing")
         
         print("Processing video and audio in parallel...")
         # Process video and audio in parallel
-        video_data = process_video_parallel(str(video_path))
+        video_data = process_video_parallel(video_path)
         
         print("Extracting highlights...")
         # Extract highlights
         highlights = highlight_extractor.extract_highlights(video_data)
         
-        print("Saving to database...")
-        # Save to database
-        video_id = db_manager.insert_video(file.filename, video_data["duration"])
-        for highlight in highlights:
-            db_manager.insert_highlight(
-                video_id=video_id,
-                timestamp=highlight["timestamp"],
-                description=highlight["description"],
-                summary=highlight["summary"],
-                embedding=highlight["embedding"],
-                end_timestamp=highlight.get("end_timestamp")
-            )
-        
         print("Generating video summary...")
         # Generate comprehensive video summary
         video_summary = gemini_chat.generate_summary(highlights, video_data)
         
-        # Save summary to database
-        db_manager.insert_video_summary(video_id, video_summary)
-        
+        print("Saving to database...")
+        # Save everything in one transaction: a single commit, and chat never
+        # sees a video whose highlights or summary are only partly written
+        with db_manager.transaction():
+            db_manager.update_video_duration(video_id, video_data["duration"])
+            db_manager.insert_highlights_bulk(video_id, highlights)
+            db_manager.insert_video_summary(video_id, video_summary)
+            db_manager.set_video_status(video_id, "done")
         print("Video processing complete!")
-        return {"message": "Video processed successfully", "video_id": video_id}
     
     except Exception as e:
         print(f"Error processing video: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        db_manager.set_video_status(video_id, "error", str(e))
 
-@app.post("/chat")
-async def chat(query: ChatQuery):
-    """Process a chat query and return relevant highlights"""
-    if not video_processor.is_ready or not audio_processor.is_ready:
+def save_upload(file: UploadFile, video_path: Path, chunk_size: int = 1 << 20):
+    """Copy an uploaded file to disk in fixed-size chunks"""
+    with video_path.open("wb") as buffer:
+        shutil.copyfileobj(file.file, buffer, chunk_size)
+
+@app.post("/upload", status_code=202)
+async def upload_video(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+    """Upload a video file and queue it for processing"""
+    if not models_ready():
         raise HTTPException(
             status_code=503,
             detail="Service is starting up. Models are still being loaded. Please try again in a moment."
         )
     
-    try:
-        # Step 1: Classify the query to determine what data type to search
-        query_classifier = QueryClassifier(gemini_chat)
-        data_type = query_classifier.classify_query(query.query)
-        
-        print(f"Query classified as: {data_type}")
-        
-        # Step 2: Get query embedding
-        query_embedding = highlight_extractor.get_embedding(query.query)
+    # Held until the job row exists, so a concurrent upload sees it as busy
+    async with upload_lock:
+        # Clearing the tables under a running job would leave it writing to a deleted video
+        latest = await run_in_threadpool(db_manager.get_video_status)
+        if latest and latest["status"] in ("queued", "processing"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Video {latest['id']} is still {latest['status']}. Please wait for it to finish."
+            )
         
-        # Step 3: Search based on classification
-        if data_type == "visual":
-            results = db_manager.search_visual_highlights(query_embedding)
-            print("Searching visual data only")
-        elif data_type == "audio":
-            results = db_manager.search_audio_highlights(query_embedding)
-            print("Searching audio data only")
-        elif data_type == "summary":
-            # Get pre-generated summary from database
-            summary = db_manager.get_video_summary()
-            print("Retrieving pre-generated video summary")
+        try:
+            print("Starting video upload...")
             
-            # Create a mock result with the summary to pass through Gemini
-            summary_result = [{
-                "timestamp": 0,
-                "end_timestamp": None,
-                "description": summary,
-                "summary": "",
-                "filename": "video_summary",
-                "user_question": query.query
-            }]
+            # Clear previous data before processing new video
+            print("Clearing previous video data...")
+            await run_in_threadpool(db_manager.clear_all_data)
+            chat_cache.clear()
             
-            # Let Gemini process the question with the summary context
-            gemini_response = gemini_chat.generate_response(summary_result, data_type)
+            # Save video file
+            video_path = VIDEOS_DIR / file.filename
+            print(f"Saving video to {video_path}")
+            await run_in_threadpool(save_upload, file, video_path)
             
-            return {
-                "query": query.query,
-                "data_type_used": data_type,
-                "response": gemini_response,
-                "results": []
-            }
-        else:  # both
-            results = db_manager.search_similar_highlights(query_embedding)
-            print("Searching both visual and audio data")
+            # Create the job row and hand the heavy pipeline off to a background task
+            video_id = await run_in_threadpool(db_manager.insert_video, file.filename, None, status="queued")
+            background_tasks.add_task(run_pipeline, str(video_path), video_id)
+            
+            return {"message": "Video queued for processing", "video_id": video_id, "status": "queued"}
         
-        # Step 4: Generate response with Gemini
-        gemini_response = gemini_chat.generate_response(results, data_type)
+        except Exception as e:
+            print(f"Error uploading video: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/status/{video_id}")
+async def video_status(video_id: int):
+    """Get the processing status of an uploaded video"""
+    status = await run_in_threadpool(db_manager.get_video_status, video_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Video {video_id} not found")
+    return status
+
+async def check_chat_ready() -> dict:
+    """Raise unless models are loaded and the latest video is processed; return its status"""
+    if not models_ready():
+        raise HTTPException(
+            status_code=503,
+            detail="Service is starting up. Models are still being loaded. Please try again in a moment."
+        )
+    
+    video_status = await asyncio.to_thread(db_manager.get_video_status)
+    if video_status and video_status["status"] != "done":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Video is not ready for chat yet (status: {video_status['status']})."
+        )
+    return video_status
+
+async def retrieve_context(query_text: str, video_status: dict) -> dict:
+    """Embed and classify a query concurrently, then fetch what Gemini should answer from"""
+    # Steps 1 and 2 overlap: the query is embedded locally while classification
+    # already asks Gemini; paraphrases of earlier questions and decisive local
+    # matches settle the label from the embedding and drop the Gemini call
+    embedding_task = asyncio.ensure_future(asyncio.to_thread(highlight_extractor.get_embedding, query_text))
+    label_task = asyncio.ensure_future(query_classifier.aclassify_query(query_text, embedding_task))
+    try:
+        query_embedding = await embedding_task
+    except BaseException:
+        label_task.cancel()
+        raise
+    
+    # Reuse the answer to a near-identical question
+    cached_response = chat_cache.get(query_embedding)
+    if cached_response is not None:
+        label_task.cancel()
+        return {"cached": {**cached_response, "query": query_text}}
+    
+    data_type = await label_task
+    
+    print(f"Query classified as: {data_type}")
+    
+    # Step 3: Search based on classification, off the event loop
+    if data_type == "visual":
+        results = await asyncio.to_thread(db_manager.search_visual_highlights, query_embedding)
+        print("Searching visual data only")
+    elif data_type == "audio":
+        results = await asyncio.to_thread(db_manager.search_audio_highlights, query_embedding)
+        print("Searching audio data only")
+    elif data_type == "summary":
+        # Get pre-generated summary from database
+        summary = await asyncio.to_thread(
+            db_manager.get_video_summary, video_status["id"] if video_status else None
+        )
+        print("Retrieving pre-generated video summary")
         
-        # Step 5: Format response based on data type
-        if data_type == "both" and results and isinstance(results[0], dict) and 'audio_segment' in results[0]:
-            # New format: grouped audio segments with related visuals
-            formatted_results = []
-            for segment in results:
-                audio = segment['audio_segment']
-                visuals = segment['related_visuals']
-                
-                # Add audio segment as a result
+        # Create a mock result with the summary to pass through Gemini
+        summary_result = [{
+            "timestamp": 0,
+            "end_timestamp": None,
+            "description": summary,
+            "summary": "",
+            "filename": "video_summary",
+            "user_question": query_text
+        }]
+        return {
+            "cached": None,
+            "embedding": query_embedding,
+            "data_type": data_type,
+            "context": summary_result,
+            "results": []
+        }
+    else:  # both
+        results = await asyncio.to_thread(db_manager.search_similar_highlights, query_embedding)
+        print("Searching both visual and audio data")
+    
+    return {
+        "cached": None,
+        "embedding": query_embedding,
+        "data_type": data_type,
+        "context": results,
+        "results": format_results(results, data_type)
+    }
+
+def format_results(results: list, data_type: str) -> list:
+    """Flatten search results into the JSON shape returned to clients"""
+    if data_type == "both" and results and isinstance(results[0], dict) and 'audio_segment' in results[0]:
+        # New format: grouped audio segments with related visuals
+        formatted_results = []
+        for segment in results:
+            audio = segment['audio_segment']
+            visuals = segment['related_visuals']
+            
+            # Add audio segment as a result
+            formatted_results.append({
+                "timestamp": float(audio["timestamp"]),
+                "end_timestamp": float(audio.get("end_timestamp", audio["timestamp"])),
+                "description": audio["description"],
+                "summary": "",
+                "video": audio["filename"],
+                "similarity": float(audio["similarity"]),
+                "type": "audio"
+            })
+            
+            # Add related visuals as results
+            for visual in visuals:
                 formatted_results.append({
-                    "timestamp": float(audio["timestamp"]),
-                    "end_timestamp": float(audio.get("end_timestamp", audio["timestamp"])),
-                    "description": audio["description"],
-                    "summary": "",
-                    "video": audio["filename"],
-                    "similarity": float(audio["similarity"]),
-                    "type": "audio"
+                    "timestamp": float(visual["timestamp"]),
+                    "end_timestamp": visual.get("end_timestamp"),
+                    "description": visual["description"],
+                    "summary": visual.get("summary", ""),
+                    "video": visual["filename"],
+                    "similarity": float(visual["similarity"]),
+                    "type": "visual"
                 })
-                
-                # Add related visuals as results
-                for visual in visuals:
-                    formatted_results.append({
-                        "timestamp": float(visual["timestamp"]),
-                        "end_timestamp": visual.get("end_timestamp"),
-                        "description": visual["description"],
-                        "summary": visual.get("summary", ""),
-                        "video": visual["filename"],
-                        "similarity": float(visual["similarity"]),
-                        "type": "visual"
-                    })
-            
-            response = {
-                "query": query.query,
-                "data_type_used": data_type,
-                "response": gemini_response,
-                "results": formatted_results
-            }
-        else:
-            # Original format for visual/audio only queries
-            response = {
-                "query": query.query,
-                "data_type_used": data_type,
-                "response": gemini_response,
-                "results": [
-                    {
-                        "timestamp": r["timestamp"],
-                        "end_timestamp": r.get("end_timestamp"),
-                        "description": r["description"],
-                        "summary": r["summary"],
-                        "video": r["filename"],
-                        "similarity": float(r["similarity"])
-                    }
-                    for r in results
-                ]
-            }
+        return formatted_results
+    
+    # Original format for visual/audio only queries
+    return [
+        {
+            "timestamp": r["timestamp"],
+            "end_timestamp": r.get("end_timestamp"),
+            "description": r["description"],
+            "summary": r["summary"],
+            "video": r["filename"],
+            "similarity": float(r["similarity"])
+        }
+        for r in results
+    ]
+
+@app.post("/chat")
+async def chat(query: ChatQuery):
+    """Process a chat query and return relevant highlights"""
+    video_status = await check_chat_ready()
+    
+    try:
+        retrieved = await retrieve_context(query.query, video_status)
+        if retrieved["cached"] is not None:
+            return retrieved["cached"]
+        
+        # Step 4: Generate response with Gemini
+        data_type = retrieved["data_type"]
+        gemini_response = await gemini_chat.agenerate_response(retrieved["context"], data_type)
         
+        response = {
+            "query": query.query,
+            "data_type_used": data_type,
+            "response": gemini_response,
+            "results": retrieved["results"]
+        }
+        if gemini_response != RESPONSE_ERROR:
+            chat_cache.put(retrieved["embedding"], response)
         return response
     
     except Exception as e:
@@ -245,7 +378,54 @@ async def chat(query: ChatQuery):
         print(f"Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_stream(query: ChatQuery):
+    """Like /chat, but stream the answer as NDJSON: one metadata line, then text deltas"""
+    video_status = await check_chat_ready()
+
+    try:
+        retrieved = await retrieve_context(query.query, video_status)
+    except Exception as e:
+        print(f"Error in chat stream endpoint: {str(e)}")
+        print(f"Error type: {type(e)}")
+        import traceback
+        print(f"Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
+
+    async def events():
+        cached = retrieved["cached"]
+        if cached is not None:
+            yield json.dumps({k: v for k, v in cached.items() if k != "response"}) + "\n"
+            yield json.dumps({"delta": cached["response"]}) + "\n"
+            return
+        
+        data_type = retrieved["data_type"]
+        yield json.dumps({
+            "query": query.query,
+            "data_type_used": data_type,
+            "results": retrieved["results"]
+        }) + "\n"
+        
+        parts = []
+        async for text in gemini_chat.astream_response(retrieved["context"], data_type):
+            parts.append(text)
+            yield json.dumps({"delta": text}) + "\n"
+        
+        # Don't remember answers that failed part-way through
+        if RESPONSE_ERROR not in parts:
+            chat_cache.put(retrieved["embedding"], {
+                "query": query.query,
+                "data_type_used": data_type,
+                "response": "".join(parts),
+                "results": retrieved["results"]
+            })
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.on_event("shutdown")
 def shutdown_event():
     """Clean up resources on shutdown"""
+    for pool in worker_pools.values():
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
     db_manager.close()
@@ -1,25 +1,252 @@
+import io
+import struct
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
+from psycopg2.extensions import connection as _PGConnection
 from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
 import numpy as np
-from config.config import DB_CONFIG
+from config.config import DB_CONFIG, DB_POOL_MIN_CONN, DB_POOL_MAX_CONN, HNSW_EF_SEARCH, IVFFLAT_PROBES, SUMMARY_CACHE_TTL, EMBEDDING_DIM
+
+def to_unit_vector(embedding: np.ndarray) -> str:
+    """L2-normalize an embedding and format it as a pgvector text literal"""
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+    # One string parameter instead of a Python list that psycopg2 adapts
+    # element by element into an ARRAY[...] expression
+    return "[" + ",".join(vector.astype(str)) + "]"
+
+class PreparingConnection(_PGConnection):
+    """Pooled connection with session-level search settings that remembers its PREPAREd statements"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        # ANN recall knobs are set once per session rather than once per search
+        with self.cursor() as cur:
+            cur.execute("SET hnsw.ef_search = %s", (HNSW_EF_SEARCH,))
+            cur.execute("SET ivfflat.probes = %s", (IVFFLAT_PROBES,))
+        self.commit()
+
+# Partial ANN indexes, one per highlight kind, so filtered searches don't post-filter
+# an index built over both: kind -> predicate (search WHERE clauses must imply it)
+ANN_PARTITIONS = {
+    "visual": "end_timestamp IS NULL",
+    "audio": "end_timestamp IS NOT NULL",
+}
+
+# Hot search queries, PREPAREd once per pooled connection: name -> (argument types, SQL)
+PREPARED_STATEMENTS = {
+    # Distances are computed once per row as a named column and sorted by alias;
+    # similarity is derived from it on the already-limited rows
+    "search_visual": (("halfvec", "int"), """
+        SELECT s.*, 1 - s.distance as similarity
+        FROM (
+            SELECT h.*, v.filename, h.embedding <=> $1 as distance
+            FROM highlights h
+            JOIN videos v ON h.video_id = v.id
+            WHERE h.end_timestamp IS NULL AND h.timestamp > 0  -- Visual only (legacy audio has timestamp = 0)
+            ORDER BY distance
+            LIMIT $2
+        ) s
+        ORDER BY s.distance
+    """),
+    # Top-$2 audio candidates with the similarity gap filter applied server-side:
+    # keep rows until the first drop larger than $3, at most $4 rows
+    "search_audio": (("halfvec", "int", "float", "int"), """
+        SELECT * FROM (
+            SELECT c.*,
+            SUM(CASE WHEN c.gap > $3 THEN 1 ELSE 0 END)
+                OVER (ORDER BY c.similarity DESC ROWS UNBOUNDED PRECEDING) as gaps_seen,
+            ROW_NUMBER() OVER (ORDER BY c.similarity DESC) as rank
+            FROM (
+                SELECT t.*, LAG(t.similarity) OVER (ORDER BY t.similarity DESC) - t.similarity as gap
+                FROM (
+                    SELECT s.*, 1 - s.distance as similarity
+                    FROM (
+                        SELECT h.*, v.filename, h.embedding <=> $1 as distance
+                        FROM highlights h
+                        JOIN videos v ON h.video_id = v.id
+                        WHERE h.timestamp >= 0 AND h.end_timestamp IS NOT NULL  -- Only audio segments
+                        ORDER BY distance
+                        LIMIT $2
+                    ) s
+                ) t
+            ) c
+        ) f
+        WHERE f.gaps_seen = 0 AND f.rank <= $4
+        ORDER BY f.similarity DESC
+    """),
+    "search_audio_with_visuals": (("halfvec", "int"), """
+        WITH nearest AS (
+            SELECT h.id, h.video_id, h.timestamp, h.end_timestamp, h.description, h.summary,
+            v.filename, h.embedding <=> $1 as distance
+            FROM highlights h
+            JOIN videos v ON h.video_id = v.id
+            WHERE h.timestamp >= 0 AND h.end_timestamp IS NOT NULL  -- Only audio segments
+            ORDER BY distance
+            LIMIT $2
+        ),
+        audio AS (
+            SELECT n.*, 1 - n.distance as similarity FROM nearest n
+        )
+        SELECT a.id as a_id, a.video_id as a_video_id, a.timestamp as a_timestamp,
+        a.end_timestamp as a_end_timestamp, a.description as a_description,
+        a.summary as a_summary, a.filename as a_filename, a.similarity as a_similarity,
+        r.id as v_id, r.video_id as v_video_id, r.timestamp as v_timestamp,
+        r.end_timestamp as v_end_timestamp, r.description as v_description,
+        r.summary as v_summary, r.filename as v_filename, r.similarity as v_similarity
+        FROM audio a
+        LEFT JOIN LATERAL (
+            SELECT h.*, v.filename,
+            0.8 as similarity  -- Default similarity for time-based matches
+            FROM highlights h
+            JOIN videos v ON h.video_id = v.id
+            WHERE h.timestamp BETWEEN a.timestamp - 2 AND a.end_timestamp + 2  -- 2 seconds either side
+            AND h.end_timestamp IS NULL  -- Only visual highlights
+            ORDER BY h.timestamp
+            LIMIT 3
+        ) r ON true
+        ORDER BY a.similarity DESC, r.timestamp
+    """),
+    # Visuals for many time ranges in one round-trip; r.idx is the 1-based range index
+    "visuals_in_timeranges": (("float[]", "float[]", "int"), """
+        SELECT r.idx, w.*
+        FROM unnest($1, $2) WITH ORDINALITY AS r(start_time, end_time, idx),
+        LATERAL (
+            SELECT h.*, v.filename,
+            0.8 as similarity  -- Default similarity for time-based matches
+            FROM highlights h
+            JOIN videos v ON h.video_id = v.id
+            WHERE h.timestamp BETWEEN r.start_time AND r.end_time 
+            AND h.end_timestamp IS NULL  -- Only visual highlights
+            ORDER BY h.timestamp
+            LIMIT $3
+        ) w
+        ORDER BY r.idx, w.timestamp
+    """),
+}
 
 class DatabaseManager:
     def __init__(self):
-        self.conn = None
+        self.pool = None
+        # video_id -> (fetched_at, summary); invalidated on every write path
+        self._summary_cache = {}
+        # Bumped on each invalidation; a read that raced one doesn't cache its result
+        self._summary_generation = 0
+        self._summary_lock = threading.Lock()
+        # Connection of the transaction() open on the current thread, if any
+        self._local = threading.local()
+        # "hnsw" or "ivfflat", depending on what the installed pgvector supports
+        self.ann_index = "hnsw"
         self.connect()
         self.create_tables()
     
-    def connect(self):
-        """Establish connection to PostgreSQL database"""
-        self.conn = psycopg2.connect(**DB_CONFIG)
+    def connect(self, retries: int = 5, retry_delay: float = 1.0):
+        """Create the PostgreSQL connection pool, retrying while the server starts"""
+        for attempt in range(1, retries + 1):
+            try:
+                self.pool = ThreadedConnectionPool(DB_POOL_MIN_CONN, DB_POOL_MAX_CONN,
+                                                   connection_factory=PreparingConnection, **DB_CONFIG)
+                break
+            except psycopg2.OperationalError as e:
+                if attempt == retries:
+                    raise
+                print(f"Database not reachable (attempt {attempt}/{retries}): {e}")
+                time.sleep(retry_delay * attempt)
+        
         # Enable pgvector extension
-        with self.conn.cursor() as cur:
+        with self.get_conn() as conn, conn.cursor() as cur:
             cur.execute('CREATE EXTENSION IF NOT EXISTS vector;')
-        self.conn.commit()
+            # halfvec needs pgvector >= 0.7; upgrade databases created with an older image
+            cur.execute('ALTER EXTENSION vector UPDATE;')
+    
+    @contextmanager
+    def transaction(self):
+        """Group every DatabaseManager call made on this thread into one transaction"""
+        if getattr(self._local, "conn", None) is not None:
+            # Already inside a transaction; join it
+            yield
+            return
+        
+        on_commit = []
+        with self.get_conn() as conn:
+            self._local.conn = conn
+            self._local.on_commit = on_commit
+            try:
+                yield
+            finally:
+                self._local.conn = None
+                self._local.on_commit = None
+        # Committed; a rolled-back transaction never gets here
+        for callback in on_commit:
+            callback()
+    
+    def _after_commit(self, callback):
+        """Run callback once the current thread's transaction commits, or now outside one"""
+        pending = getattr(self._local, "on_commit", None)
+        if pending is None:
+            callback()
+        else:
+            pending.append(callback)
+    
+    def _invalidate_summaries(self):
+        """Forget cached summaries, including reads that are in flight"""
+        with self._summary_lock:
+            self._summary_generation += 1
+            self._summary_cache.clear()
+    
+    @contextmanager
+    def get_conn(self):
+        """Check out a pooled connection, committing on success and rolling back on error"""
+        shared = getattr(self._local, "conn", None)
+        if shared is not None:
+            # Inside transaction(): the outermost block commits or rolls back
+            yield shared
+            return
+        
+        conn = self.pool.getconn()
+        if conn.closed:
+            # The server dropped this connection; replace it with a fresh one
+            self.pool.putconn(conn, close=True)
+            conn = self.pool.getconn()
+        
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except psycopg2.OperationalError:
+            # Connection-level failure: don't hand this connection out again
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            # Don't trust the prepared-statement bookkeeping of a failed transaction
+            conn.prepared.clear()
+            raise
+        finally:
+            self.pool.putconn(conn, close=broken)
+    
+    def _execute_prepared(self, cur, name: str, params: tuple):
+        """EXECUTE a statement from PREPARED_STATEMENTS, preparing it on first use per connection"""
+        conn = cur.connection
+        arg_types, sql = PREPARED_STATEMENTS[name]
+        if name not in conn.prepared:
+            cur.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+            if cur.fetchone() is None:
+                cur.execute(f"PREPARE {name} ({', '.join(arg_types)}) AS {sql}")
+            conn.prepared.add(name)
+        
+        placeholders = ", ".join(f"%s::{arg_type}" for arg_type in arg_types)
+        cur.execute(f"EXECUTE {name} ({placeholders})", params)
     
     def create_tables(self):
         """Create necessary tables if they don't exist"""
-        with self.conn.cursor() as cur:
+        with self.get_conn() as conn, conn.cursor() as cur:
             # Videos table
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS videos (
@@ -31,7 +258,7 @@ class DatabaseManager:
             """)
             
             # Highlights table with vector embedding
-            cur.execute("""
+            cur.execute(f"""
                 CREATE TABLE IF NOT EXISTS highlights (
                     id SERIAL PRIMARY KEY,
                     video_id INTEGER REFERENCES videos(id),
@@ -39,7 +266,7 @@ class DatabaseManager:
                     end_timestamp FLOAT,
                     description TEXT NOT NULL,
                     summary TEXT,
-                    embedding vector(384),
+                    embedding halfvec({EMBEDDING_DIM}),  -- fp16 halves storage and scan bandwidth
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
             """)
@@ -59,49 +286,237 @@ class DatabaseManager:
                 ALTER TABLE highlights 
                 ADD COLUMN IF NOT EXISTS end_timestamp FLOAT;
             """)
-        self.conn.commit()
+            
+            # Processing status columns for background ingestion
+            cur.execute("""
+                ALTER TABLE videos 
+                ADD COLUMN IF NOT EXISTS status VARCHAR(20) DEFAULT 'done',
+                ADD COLUMN IF NOT EXISTS error TEXT;
+            """)
+            
+            # Migrate fp32 embeddings from older databases to halfvec
+            cur.execute("""
+                SELECT udt_name FROM information_schema.columns
+                WHERE table_name = 'highlights' AND column_name = 'embedding';
+            """)
+            if cur.fetchone()[0] == "vector":
+                print(f"Migrating highlights.embedding to halfvec({EMBEDDING_DIM})...")
+                self._drop_ann_indexes(cur, "hnsw")
+                self._drop_ann_indexes(cur, "ivfflat")
+                cur.execute(f"""
+                    ALTER TABLE highlights
+                    ALTER COLUMN embedding TYPE halfvec({EMBEDDING_DIM}) USING embedding::halfvec({EMBEDDING_DIM});
+                """)
+        
+        # One summary per video, so insert_video_summary can upsert
+        with self.get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM video_summaries s
+                USING video_summaries newer
+                WHERE s.video_id = newer.video_id AND s.id < newer.id;
+            """)
+            cur.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS video_summaries_video_id
+                ON video_summaries (video_id);
+            """)
+        
+        # Visual highlights have no end_timestamp; the time-range lookup scans only those
+        with self.get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS highlights_visual_timestamp
+                ON highlights (timestamp) WHERE end_timestamp IS NULL;
+            """)
+        
+        # ANN indexes for the search_* queries, matching their cosine-distance operator
+        try:
+            with self.get_conn() as conn, conn.cursor() as cur:
+                # Superseded full-table indexes (L2, then cosine) from earlier versions
+                for legacy in ("highlights_embedding_hnsw", "highlights_embedding_hnsw_cosine",
+                               "highlights_embedding_ivfflat"):
+                    cur.execute(f"DROP INDEX IF EXISTS {legacy};")
+                self._create_hnsw_index(cur)
+        except psycopg2.Error as e:
+            # HNSW needs pgvector >= 0.5.0; fall back to IVFFlat, which is built
+            # after ingestion because its lists are clustered from existing rows
+            print(f"WARNING: Could not create HNSW index, using IVFFlat: {e}")
+            self.ann_index = "ivfflat"
+    
+    def _drop_ann_indexes(self, cur, method: str):
+        """Drop the per-partition ANN indexes built with the given method"""
+        for kind in ANN_PARTITIONS:
+            cur.execute(f"DROP INDEX IF EXISTS highlights_{kind}_{method};")
+    
+    def _create_hnsw_index(self, cur):
+        """Create the partial HNSW indexes if they don't exist"""
+        for kind, predicate in ANN_PARTITIONS.items():
+            cur.execute(f"""
+                CREATE INDEX IF NOT EXISTS highlights_{kind}_hnsw
+                ON highlights USING hnsw (embedding halfvec_cosine_ops)
+                WITH (m = 16, ef_construction = 64)
+                WHERE {predicate};
+            """)
+    
+    def _create_ivfflat_index(self, cur):
+        """Create the partial IVFFlat indexes if they don't exist, with list counts sized to each partition"""
+        for kind, predicate in ANN_PARTITIONS.items():
+            cur.execute(f"SELECT COUNT(*) FROM highlights WHERE {predicate};")
+            rows = cur.fetchone()[0]
+            # rows/1000 lists up to 1M rows, sqrt(rows) beyond (pgvector guidance)
+            lists = max(1, rows // 1000 if rows <= 1_000_000 else int(rows ** 0.5))
+            cur.execute(f"""
+                CREATE INDEX IF NOT EXISTS highlights_{kind}_ivfflat
+                ON highlights USING ivfflat (embedding halfvec_cosine_ops)
+                WITH (lists = {lists})
+                WHERE {predicate};
+            """)
     
-    def insert_video(self, filename: str, duration: float) -> int:
+    def insert_video(self, filename: str, duration: float, status: str = "done") -> int:
         """Insert a new video record and return its ID"""
-        with self.conn.cursor() as cur:
+        with self.get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO videos (filename, duration) VALUES (%s, %s) RETURNING id",
-                (filename, duration)
+                "INSERT INTO videos (filename, duration, status) VALUES (%s, %s, %s) RETURNING id",
+                (filename, duration, status)
             )
             video_id = cur.fetchone()[0]
-        self.conn.commit()
         return video_id
     
+    def update_video_duration(self, video_id: int, duration: float):
+        """Set the duration of a video once it is known"""
+        with self.get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE videos SET duration = %s WHERE id = %s",
+                (duration, video_id)
+            )
+    
+    def set_video_status(self, video_id: int, status: str, error: str = None):
+        """Record a processing status transition (queued -> processing -> done|error)"""
+        with self.get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "UPDATE videos SET status = %s, error = %s WHERE id = %s",
+                (status, error, video_id)
+            )
+    
+    def fail_interrupted_videos(self) -> int:
+        """Mark videos a previous run left queued or processing as failed; return how many"""
+        with self.get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE videos SET status = 'error', error = 'interrupted by restart'
+                WHERE status IN ('queued', 'processing')
+                """
+            )
+            return cur.rowcount
+    
+    def get_video_status(self, video_id: int = None) -> dict:
+        """Get processing status by video_id, or of the latest video if no video_id provided"""
+        with self.get_conn() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+            if video_id:
+                cur.execute(
+                    "SELECT id, filename, status, error FROM videos WHERE id = %s",
+                    (video_id,)
+                )
+            else:
+                cur.execute(
+                    "SELECT id, filename, status, error FROM videos ORDER BY created_at DESC LIMIT 1"
+                )
+            
+            result = cur.fetchone()
+            return dict(result) if result else None
+    
     def insert_highlight(self, video_id: int, timestamp: float, description: str, 
                         summary: str, embedding: np.ndarray, end_timestamp: float = None):
         """Insert a new highlight with its embedding"""
-        # Convert numpy array to list and ensure it's a flat list
-        vector_list = embedding.flatten().tolist()
+        vector_list = to_unit_vector(embedding)
         
-        with self.conn.cursor() as cur:
+        with self.get_conn() as conn, conn.cursor() as cur:
             cur.execute(
                 """
                 INSERT INTO highlights 
                 (video_id, timestamp, end_timestamp, description, summary, embedding)
-                VALUES (%s, %s, %s, %s, %s, %s::vector)
+                VALUES (%s, %s, %s, %s, %s, %s::halfvec)
                 """,
                 (video_id, timestamp, end_timestamp, description, summary, vector_list)
             )
-        self.conn.commit()
+    
+    def insert_highlights_bulk(self, video_id: int, highlights: list):
+        """Insert all highlights of a video with a single binary COPY"""
+        if not highlights:
+            return
+        
+        with self.get_conn() as conn, conn.cursor() as cur:
+            # The ANN indexes stay in place and absorb the new rows, so ingest cost
+            # follows the batch size and chat searches are never locked out
+            cur.copy_expert(
+                """
+                COPY highlights 
+                (video_id, timestamp, end_timestamp, description, summary, embedding)
+                FROM STDIN WITH (FORMAT BINARY)
+                """,
+                self._pack_highlights_copy(video_id, highlights)
+            )
+            
+            if self.ann_index == "ivfflat":
+                # IVFFlat clusters its lists from the rows present when it is built, and
+                # each upload replaces the previous video, so rebuild it on the new rows
+                self._drop_ann_indexes(cur, "ivfflat")
+                self._create_ivfflat_index(cur)
+            # Refresh planner statistics after a large batch
+            cur.execute("ANALYZE highlights;")
+    
+    def _pack_highlights_copy(self, video_id: int, highlights: list) -> io.BytesIO:
+        """Encode highlight rows in PostgreSQL's binary COPY format"""
+        # Embeddings travel as raw float16 in pgvector's halfvec wire format
+        # (int16 dim, int16 unused, big-endian float2s) instead of as text
+        buf = io.BytesIO()
+        buf.write(b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0))
+        
+        def text(value):
+            if value is None:
+                return struct.pack("!i", -1)
+            data = value.encode("utf-8")
+            return struct.pack("!i", len(data)) + data
+        
+        for highlight in highlights:
+            embedding = np.asarray(highlight["embedding"], dtype=">f2").ravel()
+            end_timestamp = highlight.get("end_timestamp")
+            buf.write(struct.pack("!hii", 6, 4, video_id))
+            buf.write(struct.pack("!id", 8, highlight["timestamp"]))
+            if end_timestamp is None:
+                buf.write(struct.pack("!i", -1))
+            else:
+                buf.write(struct.pack("!id", 8, end_timestamp))
+            buf.write(text(highlight["description"]))
+            buf.write(text(highlight["summary"]))
+            buf.write(struct.pack("!ihh", 4 + embedding.nbytes, embedding.size, 0))
+            buf.write(embedding.tobytes())
+        
+        buf.write(struct.pack("!h", -1))
+        buf.seek(0)
+        return buf
     
     def insert_video_summary(self, video_id: int, summary: str):
-        """Insert a video summary"""
-        with self.conn.cursor() as cur:
+        """Store the summary of a video, replacing any previous one"""
+        with self.get_conn() as conn, conn.cursor() as cur:
             cur.execute(
-                "INSERT INTO video_summaries (video_id, summary) VALUES (%s, %s)",
+                """
+                INSERT INTO video_summaries (video_id, summary) VALUES (%s, %s)
+                ON CONFLICT (video_id)
+                DO UPDATE SET summary = EXCLUDED.summary, created_at = CURRENT_TIMESTAMP
+                """,
                 (video_id, summary)
             )
-        self.conn.commit()
+        # Only after the commit, or a concurrent read could re-cache the old summary
+        self._after_commit(self._invalidate_summaries)
         print(f"Video summary saved for video_id: {video_id}")
 
     def get_video_summary(self, video_id: int = None) -> str:
         """Get video summary by video_id, or get the latest if no video_id provided"""
-        with self.conn.cursor(cursor_factory=DictCursor) as cur:
+        cached = self._summary_cache.get(video_id)
+        if cached and time.monotonic() - cached[0] < SUMMARY_CACHE_TTL:
+            return cached[1]
+        generation = self._summary_generation
+        
+        with self.get_conn() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
             if video_id:
                 cur.execute(
                     "SELECT summary FROM video_summaries WHERE video_id = %s ORDER BY created_at DESC LIMIT 1",
@@ -114,26 +529,21 @@ class DatabaseManager:
                 )
             
             result = cur.fetchone()
-            return result['summary'] if result else "No summary available for this video."
+        
+        if not result:
+            return "No summary available for this video."
+        
+        with self._summary_lock:
+            if generation == self._summary_generation:
+                self._summary_cache[video_id] = (time.monotonic(), result['summary'])
+        return result['summary']
 
     def search_visual_highlights(self, query_embedding: np.ndarray, limit: int = 5):
         """Search only visual descriptions (excludes audio transcription)"""
-        # Convert numpy array to list and ensure it's a flat list
-        vector_list = query_embedding.flatten().tolist()
+        vector_list = to_unit_vector(query_embedding)
         
-        with self.conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute(
-                """
-                SELECT h.*, v.filename,
-                1 - (h.embedding <-> %s::vector) as similarity
-                FROM highlights h
-                JOIN videos v ON h.video_id = v.id
-                WHERE h.timestamp > 0  -- Exclude audio (timestamp = 0)
-                ORDER BY h.embedding <-> %s::vector
-                LIMIT %s
-                """,
-                (vector_list, vector_list, limit)
-            )
+        with self.get_conn() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+            self._execute_prepared(cur, "search_visual", (vector_list, limit))
             results = cur.fetchall()
             print(f"DEBUG: Visual search returned {len(results)} results")
             for i, r in enumerate(results[:2]):  # Show first 2
@@ -142,57 +552,52 @@ class DatabaseManager:
 
     def search_audio_highlights(self, query_embedding: np.ndarray, limit: int = 5):
         """Search only audio transcription with similarity gap detection"""
-        # Convert numpy array to list and ensure it's a flat list
-        vector_list = query_embedding.flatten().tolist()
+        vector_list = to_unit_vector(query_embedding)
         
-        with self.conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute(
-                """
-                SELECT h.*, v.filename,
-                1 - (h.embedding <-> %s::vector) as similarity
-                FROM highlights h
-                JOIN videos v ON h.video_id = v.id
-                WHERE h.timestamp >= 0 AND h.end_timestamp IS NOT NULL  -- Only audio segments
-                ORDER BY h.embedding <-> %s::vector
-                """,
-                (vector_list, vector_list)
-            )
-            all_results = cur.fetchall()
-            
-            # Apply similarity gap detection with stricter threshold for max 2 results
-            results = self._filter_by_similarity_gap(all_results, gap_threshold=0.05)
+        with self.get_conn() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+            # Similarity gap detection (stricter threshold, max 2 results) runs in SQL,
+            # so only the kept rows come back over the wire
+            self._execute_prepared(cur, "search_audio", (vector_list, limit, 0.05, 2))
+            results = cur.fetchall()
             
-            print(f"DEBUG: Audio search returned {len(results)} results (from {len(all_results)} candidates)")
+            print(f"DEBUG: Audio search returned {len(results)} results (from top {limit} candidates)")
             for i, r in enumerate(results):
                 print(f"DEBUG: Audio result {i}: timestamp={r['timestamp']:.2f}-{r.get('end_timestamp', 'N/A')}, similarity={r['similarity']:.3f}, desc='{r['description'][:50]}...'")
             return results
 
     def search_similar_highlights(self, query_embedding: np.ndarray, limit: int = 5):
         """Search for similar highlights - returns audio segments + related visuals"""
-        # Get relevant audio segments first
-        audio_segments = self.search_audio_highlights(query_embedding)
+        vector_list = to_unit_vector(query_embedding)
         
-        results = []
+        # One round-trip: top audio segments, each LATERAL-joined to the visuals
+        # shown around it (one row per segment/visual pair)
+        with self.get_conn() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+            self._execute_prepared(cur, "search_audio_with_visuals", (vector_list, limit))
+            rows = cur.fetchall()
         
-        for audio_segment in audio_segments:
-            # Get visual highlights from the same time period
-            start_time = audio_segment['timestamp']
-            end_time = audio_segment.get('end_timestamp', start_time + 5)  # Default 5 second window
-            
-            related_visuals = self.search_visual_highlights_in_timerange(
-                start_time - 2,  # 2 seconds before
-                end_time + 2,    # 2 seconds after
-                limit=3
-            )
-            
-            # Create a grouped result
-            segment_result = {
+        audio_fields = ("id", "video_id", "timestamp", "end_timestamp", "description", "summary", "filename", "similarity")
+        candidates = {}
+        for row in rows:
+            segment = candidates.setdefault(row["a_id"], {
+                "audio_segment": {field: row[f"a_{field}"] for field in audio_fields},
+                "related_visuals": []
+            })
+            if row["v_id"] is not None:
+                segment["related_visuals"].append({field: row[f"v_{field}"] for field in audio_fields})
+        
+        # Same similarity gap detection as the audio-only search
+        candidates = list(candidates.values())
+        kept = self._filter_by_similarity_gap([c["audio_segment"] for c in candidates], gap_threshold=0.05)
+        
+        results = []
+        for candidate in candidates[:len(kept)]:
+            audio_segment = candidate["audio_segment"]
+            results.append({
                 'audio_segment': audio_segment,
-                'related_visuals': related_visuals,
-                'timestamp': start_time,
-                'end_timestamp': end_time
-            }
-            results.append(segment_result)
+                'related_visuals': candidate["related_visuals"],
+                'timestamp': audio_segment['timestamp'],
+                'end_timestamp': audio_segment['end_timestamp']
+            })
         
         print(f"DEBUG: Combined search returned {len(results)} audio segments with related visuals")
         for i, result in enumerate(results):
@@ -204,66 +609,60 @@ class DatabaseManager:
 
     def search_visual_highlights_in_timerange(self, start_time: float, end_time: float, limit: int = 3):
         """Find visual highlights within a specific time range"""
-        with self.conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute(
-                """
-                SELECT h.*, v.filename,
-                0.8 as similarity  -- Default similarity for time-based matches
-                FROM highlights h
-                JOIN videos v ON h.video_id = v.id
-                WHERE h.timestamp BETWEEN %s AND %s 
-                AND h.end_timestamp IS NULL  -- Only visual highlights
-                ORDER BY h.timestamp
-                LIMIT %s
-                """,
-                (start_time, end_time, limit)
-            )
-            return cur.fetchall()
+        return self.search_visual_highlights_in_timeranges([start_time], [end_time], limit)[0]
+    
+    def search_visual_highlights_in_timeranges(self, starts: list, ends: list, limit: int = 3) -> list:
+        """Find visual highlights for several time ranges at once; one result list per range"""
+        grouped = [[] for _ in starts]
+        if not starts:
+            return grouped
+        
+        with self.get_conn() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+            self._execute_prepared(cur, "visuals_in_timeranges", (list(starts), list(ends), limit))
+            for row in cur.fetchall():
+                grouped[row["idx"] - 1].append(row)
+        return grouped
 
     def _filter_by_similarity_gap(self, results, gap_threshold=0.05, max_results=2):
         """Filter results using similarity gap detection with absolute maximum limit"""
         if not results:
             return []
         
-        # Always include the first (best) result
-        filtered_results = [results[0]]
-        
-        # Check each subsequent result for similarity gaps
-        for i in range(1, len(results)):
-            # Stop if we've reached the maximum number of results
-            if len(filtered_results) >= max_results:
-                print(f"DEBUG: Reached maximum limit of {max_results} results")
-                break
-                
-            current = results[i-1]  # Previous result (already in filtered_results)
-            next_result = results[i]  # Current result being evaluated
-            
-            # Check similarity gap
-            similarity_gap = current['similarity'] - next_result['similarity']
-            
-            print(f"DEBUG: Checking gap: {current['similarity']:.3f} -> {next_result['similarity']:.3f} (gap: {similarity_gap:.3f})")
-            
-            if similarity_gap > gap_threshold:
-                print(f"DEBUG: Similarity gap detected: {current['similarity']:.3f} -> {next_result['similarity']:.3f} (gap: {similarity_gap:.3f}) - stopping here")
-                break
-            else:
-                # Gap is small enough, include this result
-                filtered_results.append(next_result)
+        # Keep results up to (not including) the first drop larger than the threshold
+        similarities = np.fromiter((r['similarity'] for r in results), dtype=np.float64, count=len(results))
+        gaps = np.flatnonzero(-np.diff(similarities) > gap_threshold)
+        cut = gaps[0] + 1 if gaps.size else len(results)
+        filtered_results = results[:min(cut, max_results)]
         
         print(f"DEBUG: Gap filtering: {len(results)} -> {len(filtered_results)} results")
         return filtered_results
     
+    def export_highlights_csv(self, out, video_id: int = None):
+        """Stream highlights as CSV into a file-like object using COPY"""
+        with self.get_conn() as conn, conn.cursor() as cur:
+            # COPY streams rows straight from the server instead of buffering a result set
+            query = cur.mogrify(
+                """
+                SELECT video_id, timestamp, end_timestamp, description, summary
+                FROM highlights
+                WHERE %s IS NULL OR video_id = %s
+                ORDER BY video_id, timestamp
+                """,
+                (video_id, video_id)
+            ).decode()
+            cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+    
     def close(self):
-        """Close the database connection"""
-        if self.conn:
-            self.conn.close()
+        """Close all pooled database connections"""
+        if self.pool:
+            self.pool.closeall()
 
     def clear_all_data(self):
         """Clear all videos and highlights from the database"""
-        with self.conn.cursor() as cur:
+        with self.get_conn() as conn, conn.cursor() as cur:
             # Delete in correct order to avoid foreign key constraint violations
             cur.execute("DELETE FROM video_summaries;")  # Delete summaries first
             cur.execute("DELETE FROM highlights;")       # Then highlights
             cur.execute("DELETE FROM videos;")           # Finally videos
-        self.conn.commit()
+        self._after_commit(self._invalidate_summaries)
         print("Database cleared: all videos, highlights, and summaries removed")
@@ -1,27 +1,82 @@
 import streamlit as st
 import requests
-import os
-from pathlib import Path
 import json
+import itertools
 from datetime import timedelta
 import time
-from requests.exceptions import ConnectionError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, HTTPError
 
 # API endpoint
 API_URL = "http://backend:8000"
 
+# How often and for how long to poll a queued video before giving up
+STATUS_POLL_INTERVAL = 2
+PROCESSING_TIMEOUT = 30 * 60
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Keep-alive HTTP session shared by all reruns and browser sessions"""
+    # The script body re-executes on every rerun, so a module-level session
+    # would be rebuilt each time; cache_resource keeps a single one
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=8, pool_maxsize=16))
+    return session
+
+def wait_for_video(video_id: int) -> dict:
+    """Poll /status until the video is done or failed; raise RuntimeError on a bad response or timeout"""
+    deadline = time.monotonic() + PROCESSING_TIMEOUT
+    while time.monotonic() < deadline:
+        response = get_session().get(f"{API_URL}/status/{video_id}", timeout=10)
+        if not response.ok:
+            # e.g. 404 once another upload has cleared this video's row
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise RuntimeError(f"Status check failed ({response.status_code}): {detail}")
+        
+        status = response.json()
+        if status["status"] in ("done", "error"):
+            return status
+        time.sleep(STATUS_POLL_INTERVAL)
+    
+    raise RuntimeError(f"Video {video_id} did not finish processing within {PROCESSING_TIMEOUT // 60} minutes")
+
 def format_timestamp(seconds):
     """Format seconds into HH:MM:SS"""
     return str(timedelta(seconds=int(seconds)))
 
+@st.cache_data(ttl=5, show_spinner=False)
 def check_backend_ready():
-    """Check if backend is ready"""
+    """Check if backend is ready (cached briefly so reruns don't each hit /health)"""
     try:
-        response = requests.get(f"{API_URL}/health", timeout=1)  # Timeout après 1 seconde
+        response = get_session().get(f"{API_URL}/health", timeout=1)  # Timeout après 1 seconde
         return response.status_code == 200
     except:
         return False
 
+def stream_chat(prompt: str):
+    """Send a chat query; return its metadata and a generator over the answer text"""
+    response = get_session().post(f"{API_URL}/chat/stream", json={"query": prompt}, stream=True)
+    response.raise_for_status()
+    events = (json.loads(line) for line in response.iter_lines() if line)
+    metadata = next(events)
+    return metadata, (event["delta"] for event in events)
+
+def render_highlights(results):
+    """Render related video moments as a single markdown element in an expander"""
+    blocks = []
+    for result in results:
+        lines = [f"**At {format_timestamp(result['timestamp'])}:**", f"- {result['description']}"]
+        if result['summary']:
+            lines.append(f"- Summary: {result['summary']}")
+        lines.append(f"- Similarity: {result['similarity']:.2f}")
+        blocks.append("\n".join(lines))
+    
+    with st.expander("📽️ Related video moments"):
+        st.markdown("\n\n---\n\n".join(blocks))
+
 def main():
     st.title("🎥 Video Chat")
     
@@ -50,24 +105,22 @@ def main():
             if process_button:
                 with st.spinner("Processing video..."):
                     try:
-                        # Save the uploaded file temporarily
-                        temp_path = Path("temp_video.mp4")
-                        with open(temp_path, "wb") as f:
-                            f.write(uploaded_file.getvalue())
-                        
-                        # Upload to backend
-                        files = {"file": open(temp_path, "rb")}
-                        response = requests.post(f"{API_URL}/upload", files=files)
+                        # Upload straight from the uploader's buffer, without a temp file copy
+                        uploaded_file.seek(0)
+                        files = {"file": (uploaded_file.name, uploaded_file, uploaded_file.type)}
+                        response = get_session().post(f"{API_URL}/upload", files=files)
                         
-                        if response.status_code == 200:
-                            st.success("Video processed successfully!")
-                            st.session_state.show_chat = True
+                        if response.status_code in (200, 202):
+                            # Processing runs in the background; poll until it finishes
+                            status = wait_for_video(response.json()["video_id"])
+                            
+                            if status["status"] == "done":
+                                st.success("Video processed successfully!")
+                                st.session_state.show_chat = True
+                            else:
+                                st.error(f"Error processing video: {status['error']}")
                         else:
                             st.error(f"Error processing video: {response.text}")
-                        
-                        # Clean up
-                        os.remove(temp_path)
-                        files["file"].close()
                     except ConnectionError:
                         st.session_state.backend_ready = False
                         st.error("Could not connect to backend service. Please try again.")
@@ -85,14 +138,7 @@ def main():
                 if "response" in message:
                     st.write("🤖 " + message["response"])
                 if "results" in message:
-                    with st.expander("📽️ Related video moments"):
-                        for result in message["results"]:
-                            st.write(f"**At {format_timestamp(result['timestamp'])}:**")
-                            st.write(f"- {result['description']}")
-                            if result['summary']:
-                                st.write(f"- Summary: {result['summary']}")
-                            st.write(f"- Similarity: {result['similarity']:.2f}")
-                            st.write("---")
+                    render_highlights(message["results"])
 
         # Chat input
         if prompt := st.chat_input("Ask about the video...", disabled=not st.session_state.backend_ready):
@@ -107,36 +153,24 @@ def main():
             with st.chat_message("assistant"):
                 with st.spinner("Thinking..."):
                     try:
-                        response = requests.post(
-                            f"{API_URL}/chat",
-                            json={"query": prompt}
-                        )
+                        result, deltas = stream_chat(prompt)
                         
-                        if response.status_code == 200:
-                            result = response.json()
-                            
-                            # Add assistant message to chat history
-                            st.session_state.messages.append({
-                                "role": "assistant",
-                                "content": "Here's what I found:",
-                                "response": result["response"],
-                                "results": result["results"]
-                            })
-                            
-                            # Display Gemini's response
-                            st.write("🤖 " + result["response"])
-                            
-                            # Display video moments in an expander
-                            with st.expander("📽️ Related video moments"):
-                                for highlight in result["results"]:
-                                    st.write(f"**At {format_timestamp(highlight['timestamp'])}:**")
-                                    st.write(f"- {highlight['description']}")
-                                    if highlight['summary']:
-                                        st.write(f"- Summary: {highlight['summary']}")
-                                    st.write(f"- Similarity: {highlight['similarity']:.2f}")
-                                    st.write("---")
-                        else:
-                            st.error(f"Error: {response.text}")
+                        # Display Gemini's response as it is generated
+                        prefix = "🤖 "
+                        answer = st.write_stream(itertools.chain([prefix], deltas))[len(prefix):]
+                        
+                        # Add assistant message to chat history
+                        st.session_state.messages.append({
+                            "role": "assistant",
+                            "content": "Here's what I found:",
+                            "response": answer,
+                            "results": result["results"]
+                        })
+                        
+                        # Display video moments in an expander
+                        render_highlights(result["results"])
+                    except HTTPError as e:
+                        st.error(f"Error: {e.response.text}")
                     except ConnectionError:
                         st.session_state.backend_ready = False
                         st.error("Could not connect to backend service. Please try again.")
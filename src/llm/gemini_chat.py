@@ -1,119 +1,211 @@
+import hashlib
+import io
+from collections import OrderedDict
 import google.generativeai as genai
-from config.config import GEMINI_API_KEY
+import math
+from config.config import GEMINI_API_KEY, RESPONSE_CACHE_SIZE, PROMPT_DESCRIPTION_CHARS, SUMMARY_SECTION_CHARS
 
-class GeminiChat:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name='models/gemini-1.5-flash')
+NO_HIGHLIGHTS_RESPONSE = "Please provide the highlights from the video. I need the text of the highlights to be able to give you a detailed response."
+RESPONSE_ERROR = "I apologize, but I encountered an error while generating the response. Please try again."
+RESPONSE_CONFIG = genai.types.GenerationConfig(
+    temperature=0.6,
+    max_output_tokens=200
+)
 
-    def generate_response_simple(self, prompt: str) -> str:
-        """Generate a simple response without highlights context"""
-        try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,
-                    max_output_tokens=200
-                )
-            )
-            return response.text
-        except Exception as e:
-            print(f"Error generating simple response: {e}")
-            return "both"  # Fallback for classification
+def truncate(text: str, limit: int = PROMPT_DESCRIPTION_CHARS) -> str:
+    """Cut text to at most limit characters on a word boundary"""
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0] + "…"
 
-    def generate_response(self, highlights, data_type="unknown"):
-        """Generate response from highlights - handles both simple and grouped formats"""
-        if not highlights:
-            return "Please provide the highlights from the video. I need the text of the highlights to be able to give you a detailed response."
-        
-        # Check if this is the new grouped format (audio segments + visuals)
-        if isinstance(highlights[0], dict) and 'audio_segment' in highlights[0]:
-            # New grouped format - audio segments with related visuals
-            context_parts = []
-            context_parts.append("CONTEXT: You are analyzing a video where audio (speech) and visual elements occur simultaneously.")
-            context_parts.append("The following data shows what was SAID (audio) and what was SEEN (visual) at the same time periods.")
-            context_parts.append("Use both the speech content and visual descriptions to provide a complete understanding.\n")
-            
-            for i, segment in enumerate(highlights):
-                audio = segment['audio_segment']
-                visuals = segment['related_visuals']
-                
-                # Add audio segment with clear context
-                context_parts.append(f"TIME PERIOD {i+1} ({audio['timestamp']:.1f}s-{audio.get('end_timestamp', 'N/A')}s):")
-                context_parts.append(f"  SPEECH: \"{audio['description']}\"")
-                
-                # Add related visuals with clear context
-                if visuals:
-                    context_parts.append(f"  VISUAL SCENE during this speech:")
-                    for j, visual in enumerate(visuals):
-                        context_parts.append(f"    - At {visual['timestamp']:.1f}s: {visual['description']}")
-                else:
-                    context_parts.append(f"  VISUAL SCENE: No visual data available for this time period")
-                context_parts.append("")  # Empty line for readability
-            
-            context = "\n".join(context_parts)
-            prompt = f"""You are a video analysis assistant. Your mission is to understand and explain what happened in a video by combining both what was spoken (audio) and what was visible (visual elements).
+def fit_lines(lines: list, budget: int = SUMMARY_SECTION_CHARS) -> str:
+    """Join lines, keeping an evenly spaced subset when they exceed the character budget"""
+    # Striding (rather than cutting the tail) keeps the whole video represented
+    total = sum(len(line) + 1 for line in lines)
+    stride = max(1, math.ceil(total / budget))
+    return "\n".join(lines[::stride])
+
+# Static instruction blocks for answer prompts; only the context is filled in per call
+GROUPED_PROMPT = """You are a video analysis assistant. Your mission is to understand and explain what happened in a video by combining both what was spoken (audio) and what was visible (visual elements).
 
 When you receive data with timestamps, the audio and visual elements from the same time period are connected - they show what the speaker was saying while specific things were happening on screen.
 
 {context}
-
 Based on this synchronized audio-visual information, provide a factual response that connects what was said with what was seen:"""
-        else:
-            # Simple format - handle based on data type
-            if data_type == "visual":
-                context = "\n".join([f"At {h['timestamp']:.1f}s: {h['description']}" for h in highlights])
-                prompt = f"""You are a video analysis assistant specializing in visual content analysis. Your mission is to analyze what can be seen in video frames and describe visual elements, objects, people, actions, and scenes.
+
+VISUAL_PROMPT = """You are a video analysis assistant specializing in visual content analysis. Your mission is to analyze what can be seen in video frames and describe visual elements, objects, people, actions, and scenes.
 
 The following are visual descriptions from specific moments in the video:
 
 {context}
 
 Based on these visual observations, provide a factual response about what was seen:"""
-            
-            elif data_type == "audio":
-                context = "\n".join([f"At {h['timestamp']:.1f}s-{h.get('end_timestamp', 'N/A')}s: \"{h['description']}\"" for h in highlights])
-                prompt = f"""You are a video analysis assistant specializing in audio content analysis. Your mission is to analyze speech and dialogue from videos, understanding what was said, by whom, and in what context.
+
+AUDIO_PROMPT = """You are a video analysis assistant specializing in audio content analysis. Your mission is to analyze speech and dialogue from videos, understanding what was said, by whom, and in what context.
 
 The following are speech segments from the video with their timestamps:
 
 {context}
 
 Based on these speech segments, provide a factual response about what was said:"""
-            
-            elif data_type == "summary":
-                # For summary questions, we receive the pre-generated comprehensive summary
-                summary_content = highlights[0]['description'] if highlights else "No summary available"
-                prompt = f"""You are a video analysis assistant. You have access to a comprehensive summary of a video. Your mission is to answer specific questions about the video content using this summary.
+
+SUMMARY_PROMPT = """You are a video analysis assistant. You have access to a comprehensive summary of a video. Your mission is to answer specific questions about the video content using this summary.
 
 COMPREHENSIVE VIDEO SUMMARY:
-{summary_content}
+{summary}
 
-USER QUESTION: {highlights[0].get('user_question', 'Please provide information about this video.')}
+USER QUESTION: {question}
 
 Based on the comprehensive summary above, provide a focused answer to the user's specific question. If the question asks for general information, provide an overview. If it asks for specific details, extract and focus on those particular aspects from the summary."""
-            
-            else:
-                # Fallback for unknown data type
-                context = "\n".join([f"Timestamp: {h['timestamp']}, Description: {h['description']}, Summary: {h.get('summary', '')}" for h in highlights])
-                prompt = f"""You are a video analysis assistant. Analyze the following video content and provide a factual response:
+
+FALLBACK_PROMPT = """You are a video analysis assistant. Analyze the following video content and provide a factual response:
 
 {context}
 
 Response:"""
+
+class GeminiChat:
+    def __init__(self, api_key: str):
+        # The SDK keeps one long-lived client (and its connection) per process;
+        # sync and async calls each reuse theirs across requests
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name='models/gemini-1.5-flash')
+        # Exact-prompt answer cache: prompt digest -> response text
+        self._responses = OrderedDict()
+
+    def generate_response_simple(self, prompt: str) -> str:
+        """Generate a simple response without highlights context; API errors propagate to the caller"""
+        response = self.model.generate_content(
+            prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0.3,
+                max_output_tokens=200
+            )
+        )
+        return response.text
+
+    def generate_response(self, highlights, data_type="unknown"):
+        """Generate response from highlights - handles both simple and grouped formats"""
+        if not highlights:
+            return NO_HIGHLIGHTS_RESPONSE
+        
+        prompt = self._build_response_prompt(highlights, data_type)
+        key = self._prompt_key(prompt)
+        cached = self._recall(key)
+        if cached is not None:
+            return cached
         
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.6,
-                    max_output_tokens=200
-                )
-            )
-            return response.text
+            response = self.model.generate_content(prompt, generation_config=RESPONSE_CONFIG)
+            return self._remember(key, response.text)
+        except Exception as e:
+            print(f"Error generating response: {e}")
+            return RESPONSE_ERROR
+    
+    async def agenerate_response(self, highlights, data_type="unknown"):
+        """Async generate_response; awaits Gemini without holding a worker thread"""
+        if not highlights:
+            return NO_HIGHLIGHTS_RESPONSE
+        
+        prompt = self._build_response_prompt(highlights, data_type)
+        key = self._prompt_key(prompt)
+        cached = self._recall(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            response = await self.model.generate_content_async(prompt, generation_config=RESPONSE_CONFIG)
+            return self._remember(key, response.text)
         except Exception as e:
             print(f"Error generating response: {e}")
-            return "I apologize, but I encountered an error while generating the response. Please try again."
+            return RESPONSE_ERROR
+    
+    async def astream_response(self, highlights, data_type="unknown"):
+        """Yield the answer text as Gemini produces it"""
+        if not highlights:
+            yield NO_HIGHLIGHTS_RESPONSE
+            return
+        
+        prompt = self._build_response_prompt(highlights, data_type)
+        key = self._prompt_key(prompt)
+        cached = self._recall(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        try:
+            response = await self.model.generate_content_async(
+                prompt, generation_config=RESPONSE_CONFIG, stream=True
+            )
+            async for chunk in response:
+                parts.append(chunk.text)
+                yield chunk.text
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            yield RESPONSE_ERROR
+            return
+        
+        self._remember(key, "".join(parts))
+    
+    def _prompt_key(self, prompt: str) -> str:
+        """Compact cache key for a full prompt"""
+        return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+    
+    def _recall(self, key: str):
+        """Return a cached answer for a prompt key, if any"""
+        if key not in self._responses:
+            return None
+        self._responses.move_to_end(key)
+        return self._responses[key]
+    
+    def _remember(self, key: str, text: str) -> str:
+        """Cache a successful answer, evicting the least recently used one when full"""
+        self._responses[key] = text
+        while len(self._responses) > RESPONSE_CACHE_SIZE:
+            self._responses.popitem(last=False)
+        return text
+    
+    def _build_response_prompt(self, highlights, data_type: str) -> str:
+        """Build the answer prompt for simple or grouped (audio + visuals) highlights"""
+        # Check if this is the new grouped format (audio segments + visuals)
+        if isinstance(highlights[0], dict) and 'audio_segment' in highlights[0]:
+            # New grouped format - audio segments with related visuals
+            buf = io.StringIO()
+            for i, segment in enumerate(highlights):
+                audio = segment['audio_segment']
+                visuals = segment['related_visuals']
+                
+                buf.write(f"TIME PERIOD {i+1} ({audio['timestamp']:.1f}s-{audio.get('end_timestamp', 'N/A')}s):\n")
+                buf.write(f"  SPEECH: \"{truncate(audio['description'])}\"\n")
+                if visuals:
+                    buf.write("  VISUAL SCENE during this speech:\n")
+                    for visual in visuals:
+                        buf.write(f"    - At {visual['timestamp']:.1f}s: {truncate(visual['description'])}\n")
+                else:
+                    buf.write("  VISUAL SCENE: No visual data available for this time period\n")
+                buf.write("\n")
+            return GROUPED_PROMPT.format(context=buf.getvalue())
+        
+        # Simple format - handle based on data type
+        if data_type == "visual":
+            context = "\n".join(f"At {h['timestamp']:.1f}s: {truncate(h['description'])}" for h in highlights)
+            return VISUAL_PROMPT.format(context=context)
+        
+        if data_type == "audio":
+            context = "\n".join(f"At {h['timestamp']:.1f}s-{h.get('end_timestamp', 'N/A')}s: \"{truncate(h['description'])}\"" for h in highlights)
+            return AUDIO_PROMPT.format(context=context)
+        
+        if data_type == "summary":
+            # For summary questions, we receive the pre-generated comprehensive summary
+            return SUMMARY_PROMPT.format(
+                summary=highlights[0]['description'],
+                question=highlights[0].get('user_question', 'Please provide information about this video.')
+            )
+        
+        # Fallback for unknown data type
+        context = "\n".join(f"Timestamp: {h['timestamp']}, Description: {truncate(h['description'])}, Summary: {h.get('summary', '')}" for h in highlights)
+        return FALLBACK_PROMPT.format(context=context)
 
     def generate_summary(self, highlights, video_data):
         """Generate a comprehensive video summary using all available data"""
@@ -127,16 +219,16 @@ Response:"""
             if audio_highlights:
                 audio_segments = []
                 for h in sorted(audio_highlights, key=lambda x: x['timestamp']):
-                    audio_segments.append(f"[{h['timestamp']:.1f}s-{h.get('end_timestamp', 'N/A')}s]: {h['description']}")
-                audio_text = "\n".join(audio_segments)
+                    audio_segments.append(f"[{h['timestamp']:.1f}s-{h.get('end_timestamp', 'N/A')}s]: {truncate(h['description'])}")
+                audio_text = fit_lines(audio_segments)
             
             # Format visual descriptions
             visual_text = ""
             if visual_highlights:
                 visual_scenes = []
                 for h in sorted(visual_highlights, key=lambda x: x['timestamp']):
-                    visual_scenes.append(f"[{h['timestamp']:.1f}s]: {h['description']}")
-                visual_text = "\n".join(visual_scenes)
+                    visual_scenes.append(f"[{h['timestamp']:.1f}s]: {truncate(h['description'])}")
+                visual_text = fit_lines(visual_scenes)
             
             # Create comprehensive summary prompt
             prompt = f"""You are a video summarization expert. Create a comprehensive summary of this video.
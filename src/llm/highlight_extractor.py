@@ -1,13 +1,30 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from transformers import pipeline
 from sentence_transformers import SentenceTransformer
 import numpy as np
 import torch
-from config.config import EMBEDDING_MODEL_ID
+from functools import lru_cache
+from src.processors.quantization import quantize_model
+from config.config import EMBEDDING_MODEL_ID, EMBEDDING_DIM, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_SIZE, QUERY_CACHE_SIZE
 
 class HighlightExtractor:
     def __init__(self):
         # Initialize the embedding model for similarity search
-        self.embedding_model = SentenceTransformer(EMBEDDING_MODEL_ID)
+        self.embedding_model = quantize_model(SentenceTransformer(EMBEDDING_MODEL_ID))
+        dim = self.embedding_model.get_sentence_embedding_dimension()
+        if dim != EMBEDDING_DIM:
+            raise ValueError(f"{EMBEDDING_MODEL_ID} produces {dim}-d embeddings, "
+                             f"but highlights.embedding is halfvec({EMBEDDING_DIM})")
+        # Uncased tokenizers ignore case, so only then can queries be lowercased for the cache key
+        self._lowercase_queries = bool(getattr(self.embedding_model.tokenizer, "do_lower_case", False))
+        # Memoize query embeddings; repeated questions skip the forward pass
+        self._cached_query_embedding = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._embed_query)
+        # Text digest -> embedding, shared across videos (captions recur a lot)
+        self._embedding_cache = OrderedDict()
+        # Chat requests, the classifier and ingestion all embed from different threads
+        self._embedding_lock = threading.Lock()
     
     def extract_highlights(self, video_data: dict) -> list:
         """Extract highlights from video data"""
@@ -30,14 +47,10 @@ class HighlightExtractor:
                 
             timestamp = timestamps[i] if i < len(timestamps) else 0
             
-            # Generate embedding for similarity search
-            embedding = self.embedding_model.encode(caption)
-            
             highlights.append({
                 "timestamp": timestamp,
                 "description": caption,
-                "summary": "",  # No summary needed
-                "embedding": embedding
+                "summary": ""  # No summary needed
             })
         
         # Process audio transcription segments
@@ -58,15 +71,11 @@ class HighlightExtractor:
                         
                         print(f"DEBUG: Adding audio segment {i}: '{segment_text[:50]}...' ({start_timestamp:.2f}-{end_timestamp:.2f})")
                         
-                        # Generate embedding for similarity search
-                        embedding = self.embedding_model.encode(segment_text)
-                        
                         highlights.append({
                             "timestamp": start_timestamp,
                             "end_timestamp": end_timestamp,
                             "description": segment_text,
-                            "summary": "",  # No summary needed
-                            "embedding": embedding
+                            "summary": ""  # No summary needed
                         })
             
             # Fallback to old format (single text)
@@ -74,23 +83,75 @@ class HighlightExtractor:
                 audio_text = audio_data["text"]
                 if audio_text and audio_text.strip():
                     print(f"DEBUG: Adding single audio transcription (fallback): '{audio_text[:50]}...'")
-                    audio_embedding = self.embedding_model.encode(audio_text)
                     
                     highlights.append({
                         "timestamp": 0,  # Audio spans the entire video
                         "end_timestamp": None,
                         "description": audio_text,
-                        "summary": "",  # No summary needed
-                        "embedding": audio_embedding
+                        "summary": ""  # No summary needed
                     })
             else:
                 print(f"DEBUG: Unexpected audio data format: {audio_data}")
         else:
             print(f"DEBUG: No audio transcription found in video_data")
         
+        # Generate embeddings for similarity search in a single batched pass,
+        # encoding each distinct description once (static scenes repeat captions)
+        unique_texts = list(dict.fromkeys(h["description"] for h in highlights))
+        lookup = dict(zip(unique_texts, self.get_embeddings(unique_texts)))
+        for highlight in highlights:
+            highlight["embedding"] = lookup[highlight["description"]]
+        print(f"DEBUG: Encoded {len(unique_texts)} unique descriptions for {len(highlights)} highlights")
+        
         print(f"DEBUG: Total highlights created: {len(highlights)}")
         return highlights
     
+    def get_embeddings(self, texts: list) -> np.ndarray:
+        """Get embeddings for a list of texts, encoding only those not seen before in one batch"""
+        dim = self.embedding_model.get_sentence_embedding_dimension()
+        keys = [hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest() for text in texts]
+        
+        # Hits are copied out under the lock, so a concurrent eviction can't drop them
+        found = {}
+        misses = {}
+        with self._embedding_lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in misses:
+                    continue
+                embedding = self._embedding_cache.get(key)
+                if embedding is None:
+                    misses[key] = text
+                else:
+                    self._embedding_cache.move_to_end(key)
+                    found[key] = embedding
+        
+        if misses:
+            # SentenceTransformer sorts inputs by length internally, so each
+            # mini-batch is padded only to its own longest text
+            encoded = self.embedding_model.encode(
+                list(misses.values()),
+                batch_size=EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            found.update(zip(misses, encoded))
+            with self._embedding_lock:
+                for key in misses:
+                    self._embedding_cache[key] = found[key]
+                while len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+                    self._embedding_cache.popitem(last=False)
+        
+        result = np.stack([found[key] for key in keys]) if keys else np.empty((0, dim), dtype=np.float32)
+        return result
+    
+    def _embed_query(self, text: str) -> np.ndarray:
+        """Embed a single normalized query"""
+        return self.get_embeddings([text])[0]
+    
     def get_embedding(self, text: str) -> np.ndarray:
         """Get embedding for a text query"""
-        return self.embedding_model.encode(text)
+        # Whitespace (and case, for an uncased model) doesn't change the result
+        if self._lowercase_queries:
+            text = text.lower()
+        return self._cached_query_embedding(" ".join(text.split()))
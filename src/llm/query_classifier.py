@@ -1,86 +1,129 @@
+import asyncio
+from functools import lru_cache
+from typing import Awaitable
+import numpy as np
 from src.llm.gemini_chat import GeminiChat
+from src.llm.semantic_cache import SemanticCache
+from config.config import QUERY_CACHE_SIZE, LOCAL_CLASSIFIER_THRESHOLD, LOCAL_CLASSIFIER_MARGIN
+
+# Only one word comes back, so the prompt only carries the rules and one example each
+CLASSIFICATION_PROMPT = """Route a question about a video to the data that answers it:
+summary - the whole video in general ("What is this video about?")
+visual - what can be SEEN ("What is the man wearing?")
+audio - what was SAID ("What did he say about Athens?")
+both - a specific moment needing sight and speech ("What happened when he mentioned Athens?")
+Question: "{question}"
+Answer with exactly one word: summary, visual, audio, or both."""
+
+# Labeled questions for the local nearest-example router
+LABEL_EXAMPLES = {
+    "summary": [
+        "What is the main topic?", "Summarize this video", "What is this video about?",
+        "Give me an overview", "What's the general theme?", "What happens in this video?",
+        "Tell me about this video", "What's the content of this video?",
+    ],
+    "visual": [
+        "What is the man wearing?", "What color is his shirt?", "How many people are in the scene?",
+        "What objects are visible?", "What does he look like?", "What can be seen in the background?",
+    ],
+    "audio": [
+        "What did he say?", "What are they talking about?", "What was mentioned about the war?",
+        "What words did he use?", "What was the dialogue?", "What did the speaker explain?",
+    ],
+    "both": [
+        "What happened when he mentioned Athens?", "Describe the scene when he said goodbye",
+        "What was on screen while they talked about the battle?", "What was he doing when he spoke about his family?",
+    ],
+}
 
 class QueryClassifier:
-    def __init__(self, gemini_chat: GeminiChat):
+    def __init__(self, gemini_chat: GeminiChat, embed=None):
         self.gemini_chat = gemini_chat
+        # Memoize successful classifications by normalized question
+        self._cached_classification = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._classify)
+        # Labels of paraphrased questions, keyed by query embedding
+        self._labels = SemanticCache()
+        
+        # Optional local router: embed (list of texts -> normalized embeddings) the
+        # labeled examples once; Gemini is only asked when the nearest one is ambiguous
+        self._example_labels = None
+        if embed is not None:
+            self._example_labels = [label for label, questions in LABEL_EXAMPLES.items() for _ in questions]
+            self._example_embeddings = embed([q for questions in LABEL_EXAMPLES.values() for q in questions])
     
-    def classify_query(self, user_question: str) -> str:
+    def classify_query(self, user_question: str, embedding: np.ndarray = None) -> str:
         """Classify if question needs visual, audio, or both data"""
+        label = self._classify_embedding(embedding) if embedding is not None else None
+        if label is None:
+            label = self._ask_gemini(user_question)
+            if label is None:
+                return "both"  # Fallback on error
+            if embedding is not None:
+                self._labels.put(embedding, label)
+        return label
+    
+    async def aclassify_query(self, user_question: str, embedding: Awaitable[np.ndarray]) -> str:
+        """classify_query that asks Gemini while the query embedding is still being computed
         
-        classification_prompt = f"""
-        CONTEXT: You are helping a video analysis system decide which type of data to search through to answer a user's question.
-
-        SYSTEM EXPLANATION:
-        - We have a video that has been processed into different types of data:
-          1. VISUAL DATA: Descriptions of what can be seen in each frame (people, objects, actions, scenes, clothing, facial expressions, etc.)
-          2. AUDIO DATA: Speech-to-text transcription of what was said in the video (dialogue, narration, spoken words)
-          3. SUMMARY DATA: A comprehensive summary of the entire video covering main topics, key points, and overall narrative
-        
-        - The user will ask questions about the video content
-        - We need to search the most relevant data type to give accurate answers
-        - Searching the right data type improves accuracy and speed
-
-        YOUR TASK: Analyze the user's question and determine which data type(s) are needed to answer it accurately.
-
-        CLASSIFICATION RULES WITH EXAMPLES:
-        
-        Choose "summary" for GENERAL questions about the entire video:
-        - "What is the main topic?"
-        - "Summarize this video"
-        - "What is this video about?"
-        - "Give me an overview"
-        - "What's the general theme?"
-        - "What happens in this video?"
-        - "Tell me about this video"
-        - "What's the content of this video?"
-        
-        Choose "visual" ONLY if the question is specifically about what can be SEEN:
-        - "What is the man wearing?"
-        - "What color is his shirt?"
-        - "How many people are in the scene?"
-        - "What objects are visible?"
-        - "What does he look like?"
-          
-        Choose "audio" ONLY if the question is specifically about what was SAID or HEARD:
-        - "What did he say?"
-        - "What are they talking about?"
-        - "What was mentioned about...?"
-        - "What words did he use?"
-        - "What was the dialogue?"
-        
-        Choose "both" for questions that need CONTEXT from specific moments:
-        - "What happened when he mentioned Athens?" (needs both visual context and spoken content from that moment)
-        - "Describe the scene when he said..." (needs both what was seen and said at that time)
-
-        IMPORTANT: 
-        - For GENERAL questions about the whole video → summary
-        - For SPECIFIC visual details → visual
-        - For SPECIFIC speech content → audio  
-        - For SPECIFIC moments combining both → both
-
-        USER QUESTION: "{user_question}"
-
-        Think step by step:
-        1. Is this asking for a general overview/summary of the entire video? → summary
-        2. Is this asking specifically about what can be SEEN? → visual
-        3. Is this asking specifically about what was SAID? → audio  
-        4. Is this asking about a SPECIFIC MOMENT with both visual and audio? → both
-
-        Respond with EXACTLY ONE word: summary, visual, audio, or both
-
-        Answer:"""
+        The Gemini round-trip is dropped once the embedding turns out to settle the label
+        (a paraphrase of an earlier question, or a decisive local match). Its thread can't
+        be interrupted, but its answer still lands in the per-question cache.
+        """
+        gemini = asyncio.ensure_future(asyncio.to_thread(self._ask_gemini, user_question))
+        try:
+            embedding = await embedding
+            label = self._classify_embedding(embedding)
+            if label is not None:
+                return label
+            label = await gemini
+        finally:
+            gemini.cancel()
         
+        if label is None:
+            return "both"  # Fallback on error
+        self._labels.put(embedding, label)
+        return label
+    
+    def _classify_embedding(self, embedding: np.ndarray):
+        """Label of a paraphrased earlier question or of the local router, or None"""
+        label = self._labels.get(embedding)
+        return label if label is not None else self._classify_locally(embedding)
+    
+    def _ask_gemini(self, user_question: str):
+        """Gemini's label for the question, memoized by normalized text; None on error"""
         try:
-            response = self.gemini_chat.generate_response_simple(classification_prompt)
-            
-            # Clean and validate response
-            classification = response.strip().lower()
-            if classification in ["visual", "audio", "both", "summary"]:
-                print(f"Classification result: '{user_question}' → {classification}")
-                return classification
-            else:
-                print(f"Invalid classification response: {response}, defaulting to 'both'")
-                return "both"  # Default fallback
+            return self._cached_classification(" ".join(user_question.lower().split()))
         except Exception as e:
             print(f"Error in query classification: {e}")
-            return "both"  # Fallback on error 
\ No newline at end of file
+            return None
+    
+    def _classify_locally(self, embedding: np.ndarray):
+        """Label a query by its most similar labeled example, or None if that's not decisive"""
+        if self._example_labels is None:
+            return None
+        
+        similarities = self._example_embeddings @ embedding.ravel()
+        best = {}
+        for label, similarity in zip(self._example_labels, similarities):
+            best[label] = max(best.get(label, -1.0), float(similarity))
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        (label, top), (_, runner_up) = ranked[0], ranked[1]
+        
+        if top < LOCAL_CLASSIFIER_THRESHOLD or top - runner_up < LOCAL_CLASSIFIER_MARGIN:
+            return None
+        print(f"DEBUG: Local classification → {label} (similarity={top:.3f}, margin={top - runner_up:.3f})")
+        return label
+    
+    def _classify(self, user_question: str) -> str:
+        """Ask Gemini which data type answers the question; raises on failure so errors aren't cached"""
+        response = self.gemini_chat.generate_response_simple(
+            CLASSIFICATION_PROMPT.format(question=user_question)
+        )
+        
+        # Clean and validate response
+        classification = response.strip().lower()
+        if classification in ["visual", "audio", "both", "summary"]:
+            print(f"Classification result: '{user_question}' → {classification}")
+            return classification
+        else:
+            raise ValueError(f"Invalid classification response: {response}")
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from config.config import SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_TTL
+
+class SemanticCache:
+    """Cache values (chat responses, query labels) keyed by query embedding similarity"""
+    
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 maxsize: int = SEMANTIC_CACHE_SIZE, ttl: float = SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.ttl = ttl
+        # Each entry: {"embedding", "value", "created", "hits"}
+        self.entries = deque(maxlen=maxsize)
+        # Callers run on asyncio.to_thread workers; eviction swaps the deque out
+        self._lock = threading.Lock()
+    
+    def _expires_at(self, entry: dict) -> float:
+        """Adaptive TTL: frequently hit entries live longer (up to 4x the base TTL)"""
+        return entry["created"] + self.ttl * min(1 + entry["hits"], 4)
+    
+    def _evict_expired(self):
+        """Drop entries whose TTL has elapsed; call with the lock held"""
+        now = time.monotonic()
+        if any(self._expires_at(e) <= now for e in self.entries):
+            self.entries = deque(
+                (e for e in self.entries if self._expires_at(e) > now),
+                maxlen=self.entries.maxlen
+            )
+    
+    def get(self, embedding: np.ndarray):
+        """Return the cached value for the most similar query, if similar enough"""
+        with self._lock:
+            self._evict_expired()
+            if not self.entries:
+                return None
+            
+            # Embeddings are L2-normalized, so the dot product is the cosine similarity
+            matrix = np.stack([e["embedding"] for e in self.entries])
+            similarities = matrix @ embedding.ravel()
+            best = int(np.argmax(similarities))
+            
+            if similarities[best] < self.threshold:
+                return None
+            
+            entry = self.entries[best]
+            entry["hits"] += 1
+        print(f"DEBUG: Semantic cache hit (similarity={similarities[best]:.3f})")
+        return entry["value"]
+    
+    def put(self, embedding: np.ndarray, value):
+        """Store a value for a query embedding"""
+        with self._lock:
+            self.entries.append({
+                "embedding": embedding.ravel(),
+                "value": value,
+                "created": time.monotonic(),
+                "hits": 0
+            })
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self.entries.clear()
@@ -1,7 +1,9 @@
 import ffmpeg
+import numpy as np
 from pathlib import Path
 from transformers import pipeline
-from config.config import ASR_MODEL_ID, DEVICE
+from src.processors.quantization import quantize_model
+from config.config import ASR_MODEL_ID, ASR_CHUNK_LENGTH_S, ASR_STRIDE_LENGTH_S, ASR_BATCH_SIZE, ASR_BACKEND, WHISPER_MODEL_SIZE, ASR_ONNX_DIR, DEVICE
 
 class AudioProcessor:
     _instance = None
@@ -16,15 +18,48 @@ class AudioProcessor:
         if not self._is_initialized:
             print("Initializing AudioProcessor and loading models...")
             # Initialize speech recognition
-            self.asr = pipeline(
-                "automatic-speech-recognition",
-                model=ASR_MODEL_ID,
-                device=0 if DEVICE=="cuda" else -1,
-                return_timestamps='word'
-            )
+            if ASR_BACKEND == "faster-whisper":
+                self.asr = self._load_whisper()
+            elif ASR_ONNX_DIR:
+                self.asr = self._load_onnx_asr()
+            else:
+                self.asr = pipeline(
+                    "automatic-speech-recognition",
+                    model=ASR_MODEL_ID,
+                    device=0 if DEVICE=="cuda" else -1,
+                    return_timestamps='word'
+                )
+                self.asr.model = quantize_model(self.asr.model)
             print("Audio models loaded successfully!")
             self._is_initialized = True
     
+    def _load_whisper(self):
+        """Load a faster-whisper (CTranslate2) model"""
+        # Optional dependency, only needed when ASR_BACKEND is faster-whisper
+        from faster_whisper import WhisperModel
+        
+        print(f"Loading faster-whisper model '{WHISPER_MODEL_SIZE}'...")
+        compute_type = "float16" if DEVICE == "cuda" else "int8"
+        return WhisperModel(WHISPER_MODEL_SIZE, device=DEVICE, compute_type=compute_type)
+    
+    def _load_onnx_asr(self):
+        """Build the ASR pipeline on an ONNX Runtime export of the model"""
+        # Optional dependency, only needed when ASR_ONNX_DIR is set
+        from optimum.onnxruntime import ORTModelForCTC
+        from transformers import AutoProcessor
+        
+        print(f"Loading ONNX ASR model from {ASR_ONNX_DIR}...")
+        provider = "CUDAExecutionProvider" if DEVICE == "cuda" else "CPUExecutionProvider"
+        model = ORTModelForCTC.from_pretrained(ASR_ONNX_DIR, provider=provider)
+        processor = AutoProcessor.from_pretrained(ASR_ONNX_DIR)
+        return pipeline(
+            "automatic-speech-recognition",
+            model=model,
+            tokenizer=processor.tokenizer,
+            feature_extractor=processor.feature_extractor,
+            return_timestamps='word'
+        )
+    
     @property
     def is_ready(self):
         return self._is_initialized
@@ -37,34 +72,73 @@ class AudioProcessor:
         print("Starting audio processing...")
         
         # Extract audio from video
-        audio_path = self._extract_audio(video_path)
+        audio = self._extract_audio(video_path)
         
         # Process audio and generate transcription
         print("Transcribing audio...")
-        audio_transcription = self._process_audio(audio_path)
+        audio_transcription = self._process_audio(audio)
         
         print("Audio processing complete!")
         return audio_transcription
     
-    def _extract_audio(self, video_path: str, audio_path: str = "temp_audio.wav") -> str:
-        """Extract audio from video file"""
-        (
+    def _extract_audio(self, video_path: str) -> np.ndarray:
+        """Extract 16 kHz mono audio from video file as float32 samples"""
+        # Decode straight into memory instead of round-tripping through a WAV file
+        out, _ = (
             ffmpeg
             .input(video_path)
-            .output(audio_path, ac=1, ar='16000')
-            .overwrite_output()
-            .run(quiet=True)
+            .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar='16000')
+            .run(capture_stdout=True, quiet=True)
         )
-        return audio_path
+        return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
     
-    def _process_audio(self, audio_path: str) -> dict:
+    def _process_audio(self, audio: np.ndarray) -> dict:
         """Process audio and generate transcription with segments"""
-        result = self.asr(audio_path)
+        if ASR_BACKEND == "faster-whisper":
+            text, words = self._transcribe_whisper(audio)
+        else:
+            text, words = self._transcribe_pipeline(audio)
+        
+        # Create segments based on speech breaks
+        segments = self._create_audio_segments(words)
+        
+        print(f"DEBUG: Processed audio - text: '{text[:100]}...', words count: {len(words)}, segments count: {len(segments)}")
+        
+        # Format the result
+        return {
+            "text": text,
+            "words": words,
+            "segments": segments
+        }
+    
+    def _transcribe_whisper(self, audio: np.ndarray) -> tuple:
+        """Transcribe with faster-whisper, returning (text, words)"""
+        # VAD skips silence, so long pauses cost nothing to decode
+        segments, _ = self.asr.transcribe(audio, word_timestamps=True, vad_filter=True)
+        
+        texts = []
+        words = []
+        for segment in segments:
+            texts.append(segment.text.strip())
+            for word in segment.words or []:
+                words.append({"text": word.word.strip(), "start": word.start, "end": word.end})
+        return " ".join(texts), words
+    
+    def _transcribe_pipeline(self, audio: np.ndarray) -> tuple:
+        """Transcribe with the transformers pipeline, returning (text, words)"""
+        # Split long audio into overlapping windows and run them through the model in
+        # batches; the pipeline crops the overlap from the logits before CTC decoding
+        result = self.asr(
+            {"raw": audio, "sampling_rate": 16000},
+            chunk_length_s=ASR_CHUNK_LENGTH_S,
+            stride_length_s=ASR_STRIDE_LENGTH_S,
+            batch_size=ASR_BATCH_SIZE
+        )
         
         print(f"DEBUG: ASR raw result: {result}")
         
         if not result:
-            return {"text": "", "words": [], "segments": []}
+            return "", []
         
         # The ASR model returns 'chunks' when using return_timestamps='word'
         text = result.get("text", "")
@@ -79,64 +153,35 @@ class AudioProcessor:
                     "start": chunk["timestamp"][0] if isinstance(chunk["timestamp"], tuple) else chunk["timestamp"],
                     "end": chunk["timestamp"][1] if isinstance(chunk["timestamp"], tuple) and len(chunk["timestamp"]) > 1 else chunk["timestamp"]
                 })
-        
-        # Create segments based on speech breaks
-        segments = self._create_audio_segments(words)
-        
-        print(f"DEBUG: Processed audio - text: '{text[:100]}...', words count: {len(words)}, segments count: {len(segments)}")
-        
-        # Format the result
-        return {
-            "text": text,
-            "words": words,
-            "segments": segments
-        }
+        return text, words
     
     def _create_audio_segments(self, words: list) -> list:
         """Create audio segments based on natural speech breaks"""
         if not words:
             return []
         
-        segments = []
-        current_segment_words = []
+        # A segment ends at a pause of more than 2 seconds before the next word
+        starts = np.array([w["start"] for w in words], dtype=float)
+        ends = np.array([w["end"] for w in words], dtype=float)
+        breaks = np.flatnonzero(starts[1:] - ends[:-1] > 2.0) + 1
         
-        for i, word in enumerate(words):
-            current_segment_words.append(word)
-            
-            # Check if this is the end of a segment
-            is_end_of_segment = False
-            
-            # End of segment if:
-            # 1. It's the last word
-            if i == len(words) - 1:
-                is_end_of_segment = True
-            # 2. There's a gap > 2 seconds to the next word
-            elif i < len(words) - 1:
-                next_word = words[i + 1]
-                gap = next_word["start"] - word["end"]
-                if gap > 2.0:  # 2 second gap
-                    is_end_of_segment = True
-            
-            # 3. We have enough words for a meaningful segment (max 8 words)
-            if len(current_segment_words) >= 8:
-                is_end_of_segment = True
-            
-            if is_end_of_segment and current_segment_words:
-                # Create segment
-                segment_text = " ".join([w["text"] for w in current_segment_words])
-                start_time = current_segment_words[0]["start"]
-                end_time = current_segment_words[-1]["end"]
+        segments = []
+        bounds = [0, *breaks.tolist(), len(words)]
+        for run_start, run_end in zip(bounds[:-1], bounds[1:]):
+            # Within a run between pauses, cap segments at 8 words
+            for seg_start in range(run_start, run_end, 8):
+                seg_end = min(seg_start + 8, run_end)
+                segment_text = " ".join(w["text"] for w in words[seg_start:seg_end])
+                start_time = starts[seg_start]
+                end_time = ends[seg_end - 1]
                 
                 segments.append({
                     "text": segment_text,
                     "start_timestamp": float(start_time),
                     "end_timestamp": float(end_time),
-                    "word_count": len(current_segment_words)
+                    "word_count": seg_end - seg_start
                 })
                 
                 print(f"DEBUG: Created segment ({start_time:.2f}-{end_time:.2f}): '{segment_text[:50]}...'")
-                
-                # Reset for next segment
-                current_segment_words = []
         
         return segments
@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+import cv2
+import numpy as np
+from config.config import ENCODER_CACHE_SIZE, ENCODER_CACHE_TTL
+
+_DCT_SIZE = 32
+_HASH_SIZE = 8
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so a 2D DCT is two matrix products"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+def phash(frame: np.ndarray) -> str:
+    """64-bit perceptual hash of an RGB frame, as 16 hex digits"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (_DCT_SIZE, _DCT_SIZE), interpolation=cv2.INTER_AREA).astype(np.float64)
+    # Keep the lowest 8x8 frequencies and threshold them on their median
+    low = (_DCT @ small @ _DCT.T)[:_HASH_SIZE, :_HASH_SIZE].ravel()
+    bits = low > np.median(low)
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):016x}"
+
+class EncoderCache:
+    """LRU cache of image-encoder outputs keyed by perceptual frame hash"""
+    
+    def __init__(self, maxsize: int = ENCODER_CACHE_SIZE, ttl: float = ENCODER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # pHash -> (created, encoder hidden state)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str):
+        """Return the cached hidden state for a frame hash, if present and fresh"""
+        entry = self.entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+        
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: str, value):
+        """Store a hidden state, evicting the least recently used entry when full"""
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached entries"""
+        self.entries.clear()
@@ -0,0 +1,12 @@
+import torch
+import torch.nn as nn
+from config.config import QUANTIZE, DEVICE
+
+def quantize_model(model: nn.Module) -> nn.Module:
+    """Apply dynamic int8 quantization to a model's Linear layers when enabled"""
+    # Dynamic quantization only has CPU kernels
+    if not QUANTIZE or DEVICE != "cpu":
+        return model
+    
+    print(f"Quantizing {type(model).__name__} to int8...")
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
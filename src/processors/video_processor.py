@@ -1,13 +1,21 @@
-import cv2
+import queue
+import subprocess
+import threading
+from fractions import Fraction
+import ffmpeg
 import numpy as np
 import torch
+import torch.nn.functional as F
 from pathlib import Path
 from transformers import (
     VisionEncoderDecoderModel,
     ViTImageProcessor,
     AutoTokenizer
 )
-from config.config import CAPTION_MODEL_ID, N_FRAMES, DEVICE
+from transformers.modeling_outputs import BaseModelOutput
+from src.processors.frame_cache import EncoderCache, phash
+from src.processors.quantization import quantize_model
+from config.config import CAPTION_MODEL_ID, CAPTION_BATCH_SIZE, N_FRAMES, DEVICE
 
 class VideoProcessor:
     _instance = None
@@ -22,12 +30,34 @@ class VideoProcessor:
         if not self._is_initialized:
             print("Initializing VideoProcessor and loading models...")
             # Initialize vision models
-            self.caption_model = VisionEncoderDecoderModel.from_pretrained(CAPTION_MODEL_ID).to(DEVICE)
+            self.caption_model = self._load_caption_model().to(DEVICE).eval()
+            self.caption_model = quantize_model(self.caption_model)
             self.processor = ViTImageProcessor.from_pretrained(CAPTION_MODEL_ID)
             self.tokenizer = AutoTokenizer.from_pretrained(CAPTION_MODEL_ID)
+            # Normalization constants, folded so (x / 255 - mean) / std becomes x * scale + shift
+            mean = torch.tensor(self.processor.image_mean, device=DEVICE).view(1, -1, 1, 1)
+            std = torch.tensor(self.processor.image_std, device=DEVICE).view(1, -1, 1, 1)
+            self.pixel_scale = 1.0 / (255.0 * std)
+            self.pixel_shift = -mean / std
+            # Lives as long as the worker process, so re-uploads hit it too
+            self.encoder_cache = EncoderCache()
+            self.caption_batch_size = CAPTION_BATCH_SIZE
             print("Vision models loaded successfully!")
             self._is_initialized = True
     
+    def _load_caption_model(self):
+        """Load the caption model in half precision on CUDA, with fused SDPA attention when available"""
+        dtype = torch.float16 if DEVICE == "cuda" else torch.float32
+        try:
+            # PyTorch's scaled_dot_product_attention dispatches to flash/memory-efficient
+            # kernels, the same fast path BetterTransformer used to provide
+            return VisionEncoderDecoderModel.from_pretrained(
+                CAPTION_MODEL_ID, torch_dtype=dtype, attn_implementation="sdpa"
+            )
+        except (TypeError, ValueError, ImportError) as e:
+            print(f"DEBUG: SDPA attention unavailable ({e}), using default attention")
+            return VisionEncoderDecoderModel.from_pretrained(CAPTION_MODEL_ID, torch_dtype=dtype)
+    
     @property
     def is_ready(self):
         return self._is_initialized
@@ -44,16 +74,14 @@ class VideoProcessor:
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
         print("Getting video duration...")
-        # Get video duration
-        cap = cv2.VideoCapture(str(video_path))
-        duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / cap.get(cv2.CAP_PROP_FPS)
-        cap.release()
+        # Probe once; the frame sampler reuses the same stream info
+        fps, total_frames = self._probe(str(video_path))
+        duration = total_frames / fps
         
         print("Processing frames...")
-        # Process frames
-        frames, timestamps = self._sample_frames(str(video_path))
-        print(f"Processing {len(frames)} frames...")
-        visual_descriptions = self._process_frames(frames)
+        # Stream frames through the captioner in bounded chunks
+        visual_descriptions, timestamps = self._caption_stream(str(video_path), fps, total_frames)
+        print(f"Processed {len(visual_descriptions)} frames")
         
         print("Video processing complete!")
         return {
@@ -62,60 +90,224 @@ class VideoProcessor:
             "timestamps": timestamps
         }
     
-    def _sample_frames(self, video_path: str) -> list:
-        """Sample one frame per second from the video"""
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
+    def _caption_stream(self, video_path: str, fps: float, total_frames: int,
+                        chunk_size: int = CAPTION_BATCH_SIZE) -> tuple:
+        """Decode and caption frames concurrently, holding at most a few chunks in memory"""
+        # A decoder thread fills the queue while this thread runs the caption model;
+        # maxsize bounds peak memory to a few chunks of frames regardless of video length
+        chunks = queue.Queue(maxsize=2)
+        done = object()
+        # Set when the consumer stops early, so the producer can't block forever on a full queue
+        stop = threading.Event()
         
-        print(f"Video info: {total_frames} frames, {fps} FPS, {duration:.2f} seconds")
+        def offer(item) -> bool:
+            """Put item on the queue unless the consumer has stopped; False if it has"""
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
         
-        frames = []
+        def produce():
+            frames = self._iter_frames(video_path, fps, total_frames)
+            try:
+                chunk = []
+                for frame, second in frames:
+                    chunk.append((frame, second))
+                    if len(chunk) == chunk_size:
+                        if not offer(chunk):
+                            return
+                        chunk = []
+                if chunk and not offer(chunk):
+                    return
+                offer(done)
+            except Exception as e:
+                offer(e)
+            finally:
+                # Closing the generator closes ffmpeg's pipe and waits for it to exit
+                frames.close()
+        
+        threading.Thread(target=produce, daemon=True).start()
+        
+        captions = []
         timestamps = []
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is done:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                
+                frames, seconds = zip(*chunk)
+                captions.extend(self._process_frames(list(frames)))
+                timestamps.extend(seconds)
+        finally:
+            stop.set()
         
-        # Get one frame per second, starting from the first valid frame
+        return captions, timestamps
+    
+    def _probe(self, video_path: str) -> tuple:
+        """Return (fps, total_frames) of the video stream"""
+        probe = ffmpeg.probe(video_path)
+        stream = next(s for s in probe["streams"] if s["codec_type"] == "video")
+        frame_rate = stream.get("avg_frame_rate", "0/0")
+        fps = float(Fraction(frame_rate if frame_rate != "0/0" else stream["r_frame_rate"]))
+        if "nb_frames" in stream:
+            total_frames = int(stream["nb_frames"])
+        else:
+            total_frames = int(float(probe["format"]["duration"]) * fps)
+        return fps, total_frames
+    
+    def _iter_frames(self, video_path: str, fps: float, total_frames: int):
+        """Yield (frame, second) for one frame per second, decoded in a single ffmpeg pass"""
+        duration = total_frames / fps
+        
+        print(f"Video info: {total_frames} frames, {fps} FPS, {duration:.2f} seconds")
+        
+        # Frame index -> second, one frame per second of video
+        wanted = {}
         for second in range(int(duration)):
             frame_index = int(second * fps)
             if frame_index >= total_frames:
                 break
+            wanted.setdefault(frame_index, second)
+        
+        if not wanted:
+            return
+        
+        # Frame n is wanted iff some integer second s has int(s * fps) == n, i.e.
+        # ceil(n / fps) * fps < n + 1. This keeps the select expression constant-size
+        # regardless of video length, and ffmpeg decodes the stream exactly once.
+        last_index = max(wanted)
+        select_expr = f"lt(ceil(n/{fps!r})*{fps!r},n+1)*lte(n,{last_index})"
+        # Downscale to the model's input size inside ffmpeg, so only model-sized
+        # frames cross the pipe and get uploaded to the device
+        height, width = self._input_size()
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-noautorotate"]
+        if DEVICE == "cuda":
+            # Hardware decode (NVDEC) when ffmpeg supports it, software otherwise
+            cmd += ["-hwaccel", "auto"]
+        cmd += [
+            "-i", video_path,
+            "-vf", f"select='{select_expr}',scale={width}:{height}:flags=area",
+            "-vsync", "0",
+            "-f", "rawvideo", "-pix_fmt", "rgb24",
+            "pipe:"
+        ]
+        
+        frame_count = 0
+        frame_size = width * height * 3
+        
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        try:
+            for frame_index in sorted(wanted):
+                second = wanted[frame_index]
+                raw = process.stdout.read(frame_size)
+                if len(raw) < frame_size:
+                    print(f"Could not read frame at second {second} (index {frame_index})")
+                    break
                 
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
-            ret, frame = cap.read()
-            if ret and frame is not None and frame.size > 0:
-                # Convert to RGB and check if frame is not empty
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                if rgb_frame.size > 0 and not np.all(rgb_frame == 0):
-                    frames.append(rgb_frame)
-                    timestamps.append(second)
+                rgb_frame = np.frombuffer(raw, np.uint8).reshape(height, width, 3)
+                if not np.all(rgb_frame == 0):
+                    frame_count += 1
                     print(f"Successfully read frame at second {second} (index {frame_index})")
+                    yield rgb_frame, second
                 else:
                     print(f"Empty or invalid frame at second {second} (index {frame_index})")
-            else:
-                print(f"Could not read frame at second {second} (index {frame_index})")
+        finally:
+            process.stdout.close()
+            process.wait()
         
-        cap.release()
-        print(f"Total valid frames sampled: {len(frames)}")
-        return frames, timestamps
+        print(f"Total valid frames sampled: {frame_count}")
     
     def _process_frames(self, frames: list) -> list:
         """Process frames and generate captions"""
-        # Process frames in batches to optimize memory usage
-        batch_size = 4
+        # Caption frames in large batches: one encoder pass and one generate loop per batch
         captions = []
         
-        for i in range(0, len(frames), batch_size):
-            batch = frames[i:i + batch_size]
-            pixel_values = self.processor(batch, return_tensors="pt").pixel_values.to(DEVICE)
-            with torch.no_grad():
-                out = self.caption_model.generate(
-                    pixel_values, 
-                    max_length=40,
-                    min_length=20,
-                    temperature=0.6,
-                    
-                )
-            batch_captions = self.tokenizer.batch_decode(out, skip_special_tokens=True)
+        i = 0
+        while i < len(frames):
+            batch = frames[i:i + self.caption_batch_size]
+            try:
+                batch_captions = self._caption_batch(batch)
+            except RuntimeError as e:
+                if "out of memory" not in str(e) or self.caption_batch_size == 1:
+                    raise
+                # Shrink for the rest of the worker's lifetime and retry this batch
+                torch.cuda.empty_cache()
+                self.caption_batch_size //= 2
+                print(f"DEBUG: CUDA out of memory, caption batch size reduced to {self.caption_batch_size}")
+                continue
             captions.extend(batch_captions)
+            i += len(batch)
         
         return captions
+    
+    def _caption_batch(self, batch: list) -> list:
+        """Generate captions for one batch of frames"""
+        hidden_states = self._encode_frames(batch)
+        with torch.inference_mode():
+            out = self.caption_model.generate(
+                encoder_outputs=BaseModelOutput(last_hidden_state=hidden_states),
+                max_length=40,
+                min_length=20,
+                num_beams=1,
+                do_sample=False,
+                use_cache=True
+            )
+        return self.tokenizer.batch_decode(out, skip_special_tokens=True)
+    
+    def _input_size(self) -> tuple:
+        """Return the (height, width) the ViT image processor resizes frames to"""
+        size = self.processor.size
+        if isinstance(size, dict):
+            return size["height"], size["width"]
+        if isinstance(size, int):
+            return size, size
+        return tuple(size)
+    
+    def _preprocess(self, frames: list) -> torch.Tensor:
+        """Resize and normalize a batch of frames on DEVICE, matching the ViT image processor"""
+        size = self._input_size()
+        
+        # Upload raw uint8 frames once; ffmpeg normally delivers them at the model
+        # size already, otherwise downscale on the device
+        batch = torch.from_numpy(np.stack(frames))
+        if DEVICE == "cuda":
+            batch = batch.pin_memory()
+        batch = batch.to(DEVICE, non_blocking=True).permute(0, 3, 1, 2).float()
+        if tuple(batch.shape[-2:]) != tuple(size):
+            batch = F.interpolate(batch, size=size, mode="bilinear", align_corners=False, antialias=True)
+        
+        batch = torch.addcmul(self.pixel_shift, batch, self.pixel_scale)
+        return batch.to(self.caption_model.dtype)
+    
+    def _encode_frames(self, frames: list) -> torch.Tensor:
+        """Run the ViT encoder on frames, reusing cached outputs for perceptually identical ones"""
+        keys = [phash(frame) for frame in frames]
+        
+        # Encode each distinct uncached frame once, even if it repeats within the batch
+        states = {}
+        missing = {}
+        for key, frame in zip(keys, frames):
+            if key in states or key in missing:
+                continue
+            state = self.encoder_cache.get(key)
+            if state is None:
+                missing[key] = frame
+            else:
+                states[key] = state
+        
+        if missing:
+            pixel_values = self._preprocess(list(missing.values()))
+            with torch.inference_mode():
+                encoded = self.caption_model.encoder(pixel_values=pixel_values).last_hidden_state
+            for key, state in zip(missing, encoded.cpu()):
+                self.encoder_cache.put(key, state)
+                states[key] = state
+        
+        print(f"DEBUG: Encoder cache {len(frames) - len(missing)}/{len(frames)} hits")
+        return torch.stack([states[key] for key in keys]).to(DEVICE)
@@ -0,0 +1,42 @@
+"""Process-pool entry points for the video and audio pipelines.
+
+Each worker process loads its model once in the pool initializer, so tasks
+only carry a video path in and a JSON-serializable dict out.
+"""
+
+_processor = None
+
+def _configure_torch():
+    """Size PyTorch's CPU thread pools for this worker"""
+    import torch
+    from config.config import TORCH_NUM_THREADS, DEVICE
+    if DEVICE == "cpu":
+        # Both workers run at once; the defaults would each claim every core
+        torch.set_num_threads(TORCH_NUM_THREADS)
+        torch.set_num_interop_threads(2)
+
+def init_video_worker():
+    """Load the captioning models in this worker process"""
+    global _processor
+    _configure_torch()
+    from src.processors.video_processor import VideoProcessor
+    _processor = VideoProcessor()
+
+def init_audio_worker():
+    """Load the speech recognition model in this worker process"""
+    global _processor
+    _configure_torch()
+    from src.processors.audio_processor import AudioProcessor
+    _processor = AudioProcessor()
+
+def ping() -> bool:
+    """Report whether this worker finished loading its models"""
+    return _processor is not None and _processor.is_ready
+
+def process_video(video_path: str) -> dict:
+    """Run VideoProcessor.process_video in this worker"""
+    return _processor.process_video(video_path)
+
+def process_audio(video_path: str) -> dict:
+    """Run AudioProcessor.process_audio in this worker"""
+    return _processor.process_audio(video_path)
@@ -13,34 +13,71 @@ class GameResult(Enum):
     O_WINS = -1
     DRAW = 2
 
+# Bitboards: square (row, col) is bit row * 3 + col
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,               # diagonals
+)
+FULL_BOARD = 0b111111111
+
+# The same 8 lines as flat square indices, for indexing (..., 9) board arrays
+WIN_LINES = np.array([[0, 1, 2], [3, 4, 5], [6, 7, 8],
+                      [0, 3, 6], [1, 4, 7], [2, 5, 8],
+                      [0, 4, 8], [2, 4, 6]])
+
+# IS_WIN[bb] is True when the 9-bit position bb contains a winning line
+IS_WIN = tuple(any(bb & mask == mask for mask in WIN_MASKS) for bb in range(1 << 9))
+
+# FREE_SQUARES[occupied] lists the (row, col) of the empty squares for an occupancy mask
+FREE_SQUARES = tuple(
+    tuple(divmod(square, 3) for square in range(9) if not occupied >> square & 1)
+    for occupied in range(1 << 9)
+)
+
+# CELLS[bb] is bb expanded to 9 cells of 0/1, so board expansion is two row lookups
+CELLS = ((np.arange(1 << 9)[:, None] >> np.arange(9)) & 1).astype(np.int8)
+
 class TicTacToe:
     """Core Tic-Tac-Toe game logic"""
     
+    __slots__ = ("x_bb", "o_bb", "current_player", "game_over", "winner", "move_count")
+    
     def __init__(self):
         self.reset()
     
     def reset(self):
         """Reset the game board"""
-        self.board = np.zeros((3, 3), dtype=int)
+        self.x_bb = 0
+        self.o_bb = 0
         self.current_player = Player.X
         self.game_over = False
         self.winner = None
         self.move_count = 0
     
+    @property
+    def board(self) -> np.ndarray:
+        """3x3 array view of the bitboards: 1 for X, -1 for O, 0 for empty"""
+        return (CELLS[self.x_bb] - CELLS[self.o_bb]).reshape(3, 3)
+    
     def get_board_state(self) -> np.ndarray:
         """Get current board state as numpy array"""
-        return self.board.copy()
+        return self.board
     
     def get_valid_moves(self) -> List[Tuple[int, int]]:
         """Get list of valid moves (empty positions)"""
-        return [(i, j) for i in range(3) for j in range(3) if self.board[i, j] == 0]
+        return list(FREE_SQUARES[self.x_bb | self.o_bb])
     
     def make_move(self, row: int, col: int) -> bool:
         """Make a move at the specified position"""
-        if self.game_over or self.board[row, col] != 0:
+        bit = 1 << (row * 3 + col)
+        if self.game_over or (self.x_bb | self.o_bb) & bit:
             return False
         
-        self.board[row, col] = self.current_player.value
+        if self.current_player == Player.X:
+            self.x_bb |= bit
+        else:
+            self.o_bb |= bit
         self.move_count += 1
         
         # Check for win or draw
@@ -54,33 +91,18 @@ class TicTacToe:
     
     def _check_game_end(self):
         """Check if the game has ended"""
-        # Check rows
-        for row in self.board:
-            if abs(sum(row)) == 3:
-                self.game_over = True
-                self.winner = Player.X if sum(row) == 3 else Player.O
-                return
-        
-        # Check columns
-        for col in range(3):
-            col_sum = sum(self.board[:, col])
-            if abs(col_sum) == 3:
-                self.game_over = True
-                self.winner = Player.X if col_sum == 3 else Player.O
-                return
-        
-        # Check diagonals
-        diag1_sum = sum([self.board[i, i] for i in range(3)])
-        diag2_sum = sum([self.board[i, 2-i] for i in range(3)])
-        
-        for diag_sum in [diag1_sum, diag2_sum]:
-            if abs(diag_sum) == 3:
-                self.game_over = True
-                self.winner = Player.X if diag_sum == 3 else Player.O
-                return
+        # Only the player who just moved can have completed a line
+        if self.current_player == Player.X:
+            won = IS_WIN[self.x_bb]
+        else:
+            won = IS_WIN[self.o_bb]
+        if won:
+            self.game_over = True
+            self.winner = self.current_player
+            return
         
         # Check for draw
-        if self.move_count == 9:
+        if (self.x_bb | self.o_bb) == FULL_BOARD:
             self.game_over = True
             self.winner = None  # Draw
     
@@ -106,19 +128,74 @@ class TicTacToe:
     def print_board(self):
         """Print the current board state"""
         symbols = {0: ' ', 1: 'X', -1: 'O'}
+        board = self.board
         print("\n  0   1   2")
         for i in range(3):
-            print(f"{i} {symbols[self.board[i,0]]} | {symbols[self.board[i,1]]} | {symbols[self.board[i,2]]}")
+            print(f"{i} {symbols[board[i,0]]} | {symbols[board[i,1]]} | {symbols[board[i,2]]}")
             if i < 2:
                 print("  --|---|--")
         print()
     
+    def reachable_states(self, depth: int) -> List[np.ndarray]:
+        """Boards reachable from this position within depth moves, including the current one"""
+        states = {}
+        frontier = [self]
+        for ply in range(depth + 1):
+            next_frontier = []
+            for game in frontier:
+                key = (game.x_bb, game.o_bb)
+                if key in states:
+                    continue
+                states[key] = game.board
+                if ply == depth or game.game_over:
+                    continue
+                for row, col in game.get_valid_moves():
+                    child = game.clone()
+                    child.make_move(row, col)
+                    next_frontier.append(child)
+            frontier = next_frontier
+        return list(states.values())
+    
     def clone(self):
         """Create a copy of the current game state"""
-        new_game = TicTacToe()
-        new_game.board = self.board.copy()
+        # Skip __init__: every field is overwritten below
+        new_game = TicTacToe.__new__(TicTacToe)
+        new_game.x_bb = self.x_bb
+        new_game.o_bb = self.o_bb
         new_game.current_player = self.current_player
         new_game.game_over = self.game_over
         new_game.winner = self.winner
         new_game.move_count = self.move_count
-        return new_game 
\ No newline at end of file
+        return new_game
+
+class BatchedTicTacToe:
+    """N games stepped together as (N, 9) arrays, with the same rules as TicTacToe"""
+    
+    def __init__(self, n: int):
+        self.boards = np.zeros((n, 9), dtype=np.int8)  # 1 for X, -1 for O, 0 for empty
+        self.current_player = np.full(n, Player.X.value, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+        self.winner = np.zeros(n, dtype=np.int8)  # Player value of the winner, 0 for none
+        self.move_count = np.zeros(n, dtype=np.int64)
+    
+    def make_moves(self, idx: np.ndarray, squares: np.ndarray):
+        """Play one flat square in each of the live games idx for its current player"""
+        players = self.current_player[idx]
+        self.boards[idx, squares] = players
+        self.move_count[idx] += 1
+        
+        # Only the player who just moved can have completed a line
+        won = (self.boards[idx][:, WIN_LINES].sum(axis=2) == players[:, None] * 3).any(axis=1)
+        self.winner[idx] = np.where(won, players, 0)
+        self.done[idx] = won | (self.move_count[idx] == 9)
+        self.current_player[idx] = -players
+    
+    def get_result(self, i: int) -> GameResult:
+        """Result of game i"""
+        if not self.done[i]:
+            return GameResult.ONGOING
+        elif self.winner[i] == Player.X.value:
+            return GameResult.X_WINS
+        elif self.winner[i] == Player.O.value:
+            return GameResult.O_WINS
+        return GameResult.DRAW
@@ -1,14 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import numpy as np
+import torch
 import threading
+import queue
+import logging
 import time
 from typing import Optional
 import os
 
 from game.tictactoe import TicTacToe, Player, GameResult
 from models.neural_network import TicTacToeAgent, RandomAgent, HeuristicAgent
-from training.trainer import TicTacToeTrainer
+from training.trainer import TicTacToeTrainer, logger as training_logger
+
+# Single-board moves through a tiny MLP: thread fork/join costs more than the math
+torch.set_num_threads(1)
+
+# Trained weights per neural-network difficulty
+MODEL_PATHS = {
+    "Medium": "models/trained_model.pth",  # basic trained model
+    "Hard": "models/ultra_trained_model.pth",  # ultra-trained model
+}
+
+# Cell value -> (button text, button color)
+CELL_STYLES = {0: ("", "lightgray"), 1: ("X", "lightblue"), -1: ("O", "lightcoral")}
 
 class TicTacToeGUI:
     """Graphical User Interface for Tic-Tac-Toe game"""
@@ -21,30 +36,17 @@ class TicTacToeGUI:
         
         # Game state
         self.game = TicTacToe()
-        self.agent = TicTacToeAgent()  # For Hard difficulty
-        self.medium_agent = TicTacToeAgent()  # For Medium difficulty
-        self.trainer = TicTacToeTrainer(self.agent)
-        
-        # Load different models for different difficulties
-        self.models_loaded = {"medium": False, "hard": False}
-        
-        # Try to load Medium model (basic trained model)
-        if os.path.exists("models/trained_model.pth"):
-            try:
-                self.medium_agent.load_model("models/trained_model.pth")
-                self.models_loaded["medium"] = True
-                print("✅ Loaded MEDIUM model: models/trained_model.pth")
-            except Exception as e:
-                print(f"⚠️ Failed to load medium model: {e}")
-        
-        # Try to load Hard model (ultra-trained model)
-        if os.path.exists("models/ultra_trained_model.pth"):
-            try:
-                self.agent.load_model("models/ultra_trained_model.pth")
-                self.models_loaded["hard"] = True
-                print("✅ Loaded HARD model: models/ultra_trained_model.pth (93.6% win rate)")
-            except Exception as e:
-                print(f"⚠️ Failed to load hard model: {e}")
+        # Difficulty -> agent, created and loaded on first use (or by the preload thread)
+        self.agents = {}
+        self.agents_lock = threading.Lock()
+        self.trainer = None
+        # Stateless rule-based opponents, shared across moves
+        self.opponents = {"random": RandomAgent(), "heuristic": HeuristicAgent()}
+        
+        # Models available for each difficulty; weights are loaded lazily by get_agent
+        self.models_loaded = {
+            difficulty.lower(): os.path.exists(path) for difficulty, path in MODEL_PATHS.items()
+        }
         
         # Print status
         if self.models_loaded["medium"] and self.models_loaded["hard"]:
@@ -73,8 +75,54 @@ class TicTacToeGUI:
         # Game statistics
         self.stats = {"wins": 0, "losses": 0, "draws": 0}
         
+        # Pause before AI moves so they can be followed (inference itself is instant)
+        self.ai_delay_ms = 150
+        self.pending_ai = None
+        
         self.setup_ui()
         self.new_game()
+        
+        # Load model weights in the background so the window shows up immediately
+        self.preload_thread = threading.Thread(target=self.preload_agents, daemon=True)
+        self.preload_thread.start()
+        self.root.after(100, self.check_preload)
+    
+    def preload_agents(self):
+        """Load every available difficulty model (runs on a background thread)"""
+        for difficulty in MODEL_PATHS:
+            if self.models_loaded[difficulty.lower()]:
+                self.get_agent(difficulty)
+    
+    def check_preload(self):
+        """Poll the preload thread from the Tk loop; refresh the UI once it's done"""
+        if self.preload_thread.is_alive():
+            self.root.after(100, self.check_preload)
+            return
+        self.refresh_model_labels()
+        self.warm_agents()
+    
+    @property
+    def agent(self) -> TicTacToeAgent:
+        """The Hard agent, also used for AI vs AI and training"""
+        return self.get_agent("Hard")
+    
+    def get_agent(self, difficulty: str) -> TicTacToeAgent:
+        """Return the agent for a difficulty, loading its model the first time"""
+        # A move needing an agent the preload thread is still loading waits for it
+        with self.agents_lock:
+            if difficulty not in self.agents:
+                agent = TicTacToeAgent()
+                key = difficulty.lower()
+                if self.models_loaded[key]:
+                    try:
+                        agent.load_model(MODEL_PATHS[difficulty])
+                        agent.quantize()  # play only needs inference; training reverts to fp32
+                        print(f"✅ Loaded {difficulty.upper()} model: {MODEL_PATHS[difficulty]}")
+                    except Exception as e:
+                        print(f"⚠️ Failed to load {key} model: {e}")
+                        self.models_loaded[key] = False
+                self.agents[difficulty] = agent
+            return self.agents[difficulty]
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -102,17 +150,11 @@ class TicTacToeGUI:
         easy_info = tk.Label(diff_frame, text="Easy: Random AI", font=("Arial", 8), fg="gray")
         easy_info.pack()
         
-        medium_status = "✅ Neural Network" if self.models_loaded["medium"] else "❌ No Model"
-        medium_color = "green" if self.models_loaded["medium"] else "red"
-        medium_info = tk.Label(diff_frame, text=f"Medium: {medium_status}", 
-                              font=("Arial", 8), fg=medium_color)
-        medium_info.pack()
-        
-        hard_status = "✅ Ultra AI (93.6%)" if self.models_loaded["hard"] else "❌ No Model"
-        hard_color = "green" if self.models_loaded["hard"] else "red"
-        hard_info = tk.Label(diff_frame, text=f"Hard: {hard_status}", 
-                            font=("Arial", 8), fg=hard_color)
-        hard_info.pack()
+        self.model_labels = {}
+        for key in ("medium", "hard"):
+            self.model_labels[key] = tk.Label(diff_frame, font=("Arial", 8))
+            self.model_labels[key].pack()
+        self.refresh_model_labels()
         
         # Game mode selection
         mode_frame = tk.Frame(control_frame)
@@ -147,6 +189,9 @@ class TicTacToeGUI:
                 btn.grid(row=i, column=j, padx=2, pady=2)
                 row.append(btn)
             self.buttons.append(row)
+        self.flat_buttons = [btn for row in self.buttons for btn in row]
+        # Cell values currently drawn, so redraws only touch changed buttons
+        self.drawn_cells = [None] * 9
         
         # Status and controls
         status_frame = tk.Frame(self.root)
@@ -190,7 +235,7 @@ class TicTacToeGUI:
                 
                 # AI move after human move
                 if not self.game.game_over:
-                    self.root.after(500, self.ai_move)
+                    self.schedule_ai(self.ai_move)
     
     def make_move(self, row: int, col: int):
         """Make a move on the board"""
@@ -208,36 +253,34 @@ class TicTacToeGUI:
         
         # Get AI opponent based on difficulty
         if self.difficulty.get() == "Easy":
-            opponent = RandomAgent()
-            move = opponent.get_move(current_state, valid_moves)
+            move = self.opponents["random"].get_move(current_state, valid_moves)
         elif self.difficulty.get() == "Medium":
+            agent = self.get_agent("Medium")  # loads the model on first use
             if self.models_loaded["medium"]:
                 # Use trained neural network
-                move = self.medium_agent.get_move(current_state, valid_moves, temperature=0.1)
+                move = agent.get_move(current_state, valid_moves, temperature=0.1)
             else:
                 # Fallback to heuristic agent
-                opponent = HeuristicAgent()
-                move = opponent.get_move(current_state, valid_moves)
+                move = self.opponents["heuristic"].get_move(current_state, valid_moves)
         else:  # Hard
+            agent = self.agent  # loads the model on first use
             if self.models_loaded["hard"]:
                 # Use ultra-trained neural network
-                move = self.agent.get_move(current_state, valid_moves, temperature=0.0)
+                move = agent.get_move(current_state, valid_moves, temperature=0.0)
             else:
                 # Fallback to heuristic agent (better than random)
-                opponent = HeuristicAgent()
-                move = opponent.get_move(current_state, valid_moves)
+                move = self.opponents["heuristic"].get_move(current_state, valid_moves)
         
         self.make_move(move[0], move[1])
     
     def update_board(self):
         """Update the visual board"""
-        symbols = {0: "", 1: "X", -1: "O"}
-        colors = {0: "lightgray", 1: "lightblue", -1: "lightcoral"}
-        
-        for i in range(3):
-            for j in range(3):
-                value = self.game.board[i, j]
-                self.buttons[i][j].config(text=symbols[value], bg=colors[value])
+        cells = self.game.board_to_vector().tolist()
+        for idx, value in enumerate(cells):
+            if value != self.drawn_cells[idx]:
+                text, color = CELL_STYLES[value]
+                self.flat_buttons[idx].config(text=text, bg=color)
+        self.drawn_cells = cells
         
         # Update status
         if not self.game.game_over:
@@ -279,20 +322,51 @@ class TicTacToeGUI:
             text=f"Wins: {self.stats['wins']} | Losses: {self.stats['losses']} | Draws: {self.stats['draws']}"
         )
     
+    def schedule_ai(self, callback, idle: bool = False):
+        """Run an AI step after ai_delay_ms, or as soon as Tk is idle"""
+        if idle:
+            self.pending_ai = self.root.after_idle(callback)
+        else:
+            self.pending_ai = self.root.after(self.ai_delay_ms, callback)
+    
     def new_game(self):
         """Start a new game"""
+        # Drop the previous game's scheduled AI move, if any
+        if self.pending_ai is not None:
+            self.root.after_cancel(self.pending_ai)
+            self.pending_ai = None
         self.game.reset()
         self.update_board()
+        self.warm_agents()
         
         if self.game_mode.get() == "AI vs AI":
             self.status_label.config(text="AI vs AI - Click to start", fg="blue")
-            self.root.after(1000, self.ai_vs_ai_game)
+            self.schedule_ai(self.ai_vs_ai_game)
         else:
             if self.human_is_x.get():
                 self.status_label.config(text="Your turn! (You are X)", fg="green")
             else:
                 self.status_label.config(text="AI starts! (You are O)", fg="orange")
-                self.root.after(1000, self.ai_move)
+                self.schedule_ai(self.ai_move, idle=True)
+    
+    def refresh_model_labels(self):
+        """Show which difficulties have a usable model"""
+        medium_status = "✅ Neural Network" if self.models_loaded["medium"] else "❌ No Model"
+        medium_color = "green" if self.models_loaded["medium"] else "red"
+        self.model_labels["medium"].config(text=f"Medium: {medium_status}", fg=medium_color)
+        
+        hard_status = "✅ Ultra AI (93.6%)" if self.models_loaded["hard"] else "❌ No Model"
+        hard_color = "green" if self.models_loaded["hard"] else "red"
+        self.model_labels["hard"].config(text=f"Hard: {hard_status}", fg=hard_color)
+    
+    def warm_agents(self, depth: int = 3):
+        """Batch-evaluate the opening positions so early AI moves are cache lookups"""
+        # Only the agent about to play (AI vs AI always uses the Hard agent), and
+        # only once loaded; before that the preload thread warms it when done
+        difficulty = "Hard" if self.game_mode.get() == "AI vs AI" else self.difficulty.get()
+        agent = self.agents.get(difficulty)
+        if agent is not None and self.models_loaded[difficulty.lower()]:
+            agent.warm_policy_cache(self.game.reachable_states(depth))
     
     def ai_vs_ai_game(self):
         """Run AI vs AI game"""
@@ -311,7 +385,7 @@ class TicTacToeGUI:
         self.make_move(move[0], move[1])
         
         if not self.game.game_over:
-            self.root.after(1000, self.ai_vs_ai_game)
+            self.schedule_ai(self.ai_vs_ai_game)
     
     def on_difficulty_change(self, event=None):
         """Handle difficulty change"""
@@ -323,6 +397,8 @@ class TicTacToeGUI:
     
     def open_training_window(self):
         """Open training configuration window"""
+        if self.trainer is None:
+            self.trainer = TicTacToeTrainer(self.agent)
         training_window = TrainingWindow(self.root, self.agent, self.trainer)
     
     def save_model(self):
@@ -352,6 +428,16 @@ class TicTacToeGUI:
         """Start the GUI"""
         self.root.mainloop()
 
+class QueueLogHandler(logging.Handler):
+    """Logging handler that hands each formatted record to a queue"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__()
+        self.log_queue = log_queue
+    
+    def emit(self, record: logging.LogRecord):
+        self.log_queue.put(self.format(record) + "\n")
+
 class TrainingWindow:
     """Training configuration window"""
     
@@ -364,7 +450,19 @@ class TrainingWindow:
         self.window.geometry("400x500")
         self.window.resizable(False, False)
         
+        # Training threads log into the queue; the Tk thread drains it
+        self.log_queue = queue.Queue()
+        self.log_handler = QueueLogHandler(self.log_queue)
+        training_logger.addHandler(self.log_handler)
+        self.window.bind("<Destroy>", self.on_destroy)
+        
         self.setup_training_ui()
+        self.pump_log()
+    
+    def on_destroy(self, event):
+        """Detach the log handler when the window closes"""
+        if event.widget is self.window:
+            training_logger.removeHandler(self.log_handler)
     
     def setup_training_ui(self):
         """Setup training UI"""
@@ -396,15 +494,18 @@ class TrainingWindow:
         button_frame.pack(pady=20)
         
         tk.Button(button_frame, text="Train vs Random", 
-                 command=self.train_random, bg="lightblue",
+                 command=lambda: self.start_training("train_against_random", "training against random opponent"),
+                 bg="lightblue",
                  font=("Arial", 12)).pack(pady=5, fill=tk.X)
         
         tk.Button(button_frame, text="Train vs Heuristic", 
-                 command=self.train_heuristic, bg="lightgreen",
+                 command=lambda: self.start_training("train_against_heuristic", "training against heuristic opponent"),
+                 bg="lightgreen",
                  font=("Arial", 12)).pack(pady=5, fill=tk.X)
         
         tk.Button(button_frame, text="Train Self-Play", 
-                 command=self.train_self_play, bg="lightyellow",
+                 command=lambda: self.start_training("train_self_play", "self-play training"),
+                 bg="lightyellow",
                  font=("Arial", 12)).pack(pady=5, fill=tk.X)
         
         tk.Button(button_frame, text="Evaluate Agent", 
@@ -429,110 +530,49 @@ class TrainingWindow:
         """Add message to progress text"""
         self.progress_text.insert(tk.END, message + "\n")
         self.progress_text.see(tk.END)
-        self.window.update()
     
-    def train_random(self):
-        """Train against random opponent"""
-        self.log_message("Starting training against random opponent...")
-        
-        def train_thread():
-            episodes = self.episodes_var.get()
-            batch_size = self.batch_var.get()
-            
-            # Redirect print to GUI
-            import sys
-            from io import StringIO
-            
-            old_stdout = sys.stdout
-            sys.stdout = StringIO()
-            
+    def pump_log(self):
+        """Move queued worker output into the progress text every 100 ms"""
+        if not self.window.winfo_exists():
+            return
+        chunks = []
+        while True:
             try:
-                results = self.trainer.train_against_random(episodes, batch_size)
-                output = sys.stdout.getvalue()
-                
-                self.window.after(0, lambda: self.log_message(output))
-                self.window.after(0, lambda: self.log_message(f"Training complete! Win rate: {results['win_rate']:.3f}"))
-                
-            finally:
-                sys.stdout = old_stdout
-        
-        threading.Thread(target=train_thread, daemon=True).start()
+                chunks.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if chunks:
+            self.progress_text.insert(tk.END, "".join(chunks))
+            self.progress_text.see(tk.END)
+        self.window.after(100, self.pump_log)
     
-    def train_heuristic(self):
-        """Train against heuristic opponent"""
-        self.log_message("Starting training against heuristic opponent...")
-        
-        def train_thread():
-            episodes = self.episodes_var.get()
-            batch_size = self.batch_var.get()
-            
-            import sys
-            from io import StringIO
-            
-            old_stdout = sys.stdout
-            sys.stdout = StringIO()
-            
-            try:
-                results = self.trainer.train_against_heuristic(episodes, batch_size)
-                output = sys.stdout.getvalue()
-                
-                self.window.after(0, lambda: self.log_message(output))
-                self.window.after(0, lambda: self.log_message(f"Training complete! Win rate: {results['win_rate']:.3f}"))
-                
-            finally:
-                sys.stdout = old_stdout
-        
-        threading.Thread(target=train_thread, daemon=True).start()
+    def run_logged(self, task):
+        """Run task on a worker thread; its training log reaches the window via the queue"""
+        threading.Thread(target=task, daemon=True).start()
     
-    def train_self_play(self):
-        """Train with self-play"""
-        self.log_message("Starting self-play training...")
-        
-        def train_thread():
-            episodes = self.episodes_var.get()
-            batch_size = self.batch_var.get()
-            
-            import sys
-            from io import StringIO
-            
-            old_stdout = sys.stdout
-            sys.stdout = StringIO()
-            
-            try:
-                results = self.trainer.train_self_play(episodes, batch_size)
-                output = sys.stdout.getvalue()
-                
-                self.window.after(0, lambda: self.log_message(output))
-                self.window.after(0, lambda: self.log_message(f"Training complete! Win rate: {results['win_rate']:.3f}"))
-                
-            finally:
-                sys.stdout = old_stdout
-        
-        threading.Thread(target=train_thread, daemon=True).start()
+    def start_training(self, method_name: str, description: str):
+        """Run one of the trainer's train_* methods on a worker thread"""
+        self.log_message(f"Starting {description}...")
+        # Read the Tk variables here, on the Tk thread
+        train = getattr(self.trainer, method_name)
+        episodes, batch_size = self.episodes_var.get(), self.batch_var.get()
+        
+        def task():
+            results = train(episodes, batch_size)
+            training_logger.info(f"Training complete! Win rate: {results['win_rate']:.3f}")
+        
+        self.run_logged(task)
     
     def evaluate_agent(self):
         """Evaluate the trained agent"""
         self.log_message("Evaluating agent...")
         
-        def eval_thread():
-            import sys
-            from io import StringIO
-            
-            old_stdout = sys.stdout
-            sys.stdout = StringIO()
-            
-            try:
-                # Evaluate against both opponents
-                random_results = self.trainer.evaluate_agent("random", 100)
-                heuristic_results = self.trainer.evaluate_agent("heuristic", 100)
-                
-                output = sys.stdout.getvalue()
-                self.window.after(0, lambda: self.log_message(output))
-                
-            finally:
-                sys.stdout = old_stdout
+        def evaluate():
+            # Evaluate against both opponents
+            self.trainer.evaluate_agent("random", 100)
+            self.trainer.evaluate_agent("heuristic", 100)
         
-        threading.Thread(target=eval_thread, daemon=True).start()
+        self.run_logged(evaluate)
     
     def show_progress(self):
         """Show training progress plots"""
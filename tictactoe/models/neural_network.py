@@ -3,9 +3,27 @@ import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
 import numpy as np
+import os
+import threading
 from typing import List, Tuple
+from collections import OrderedDict
 import random
 
+from game.tictactoe import IS_WIN
+
+# Upper bound on cached positions per agent (there are 5478 legal boards in total)
+POLICY_CACHE_SIZE = 4096
+
+# Device for the batch training scripts; play (batch 1) stays on the CPU default
+TRAINING_DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+# Bit value of each flat square, for packing a board into X/O bitboards
+_SQUARE_BITS = 1 << np.arange(9)
+
+def _gumbel_like(logits: torch.Tensor) -> torch.Tensor:
+    """Standard Gumbel noise with the shape of logits"""
+    return -torch.log(-torch.log(torch.rand_like(logits).clamp_min(1e-20)))
+
 class TicTacToeNet(nn.Module):
     """Neural Network for Tic-Tac-Toe move prediction"""
     
@@ -23,6 +41,9 @@ class TicTacToeNet(nn.Module):
         
         # Initialize weights
         self._init_weights()
+        
+        # Inference mode until a training step switches it
+        self.eval()
     
     def _init_weights(self):
         """Initialize network weights"""
@@ -34,62 +55,72 @@ class TicTacToeNet(nn.Module):
     def forward(self, x):
         """Forward pass through the network"""
         x = F.relu(self.fc1(x))
-        x = self.dropout(x)
+        # Dropout is the identity in eval mode; skip dispatching it at all
+        if self.training:
+            x = self.dropout(x)
         x = F.relu(self.fc2(x))
-        x = self.dropout(x)
+        if self.training:
+            x = self.dropout(x)
         x = F.relu(self.fc3(x))
         x = self.fc4(x)
         return x
     
-    def predict_move(self, board_state: np.ndarray, valid_moves: List[Tuple[int, int]], 
-                     temperature: float = 1.0) -> Tuple[int, int]:
-        """Predict the best move given a board state"""
-        self.eval()
+    @staticmethod
+    def choose_moves(move_logits: torch.Tensor, valid_masks: np.ndarray,
+                     temperature: float = 1.0) -> np.ndarray:
+        """Pick a valid move index for each row of an (N, 9) logits batch"""
+        masks = torch.as_tensor(valid_masks, dtype=torch.bool, device=move_logits.device)
+        move_logits = move_logits.float().masked_fill(~masks, float('-inf'))
         
-        with torch.no_grad():
-            # Convert board to tensor
-            board_tensor = torch.FloatTensor(board_state.flatten()).unsqueeze(0)
-            
-            # Get move probabilities
-            move_logits = self.forward(board_tensor).squeeze()
-            
-            # Apply temperature for exploration
-            if temperature > 0:
-                move_probs = F.softmax(move_logits / temperature, dim=0)
-            else:
-                move_probs = F.softmax(move_logits, dim=0)
-            
-            # Mask invalid moves
-            valid_move_probs = torch.zeros_like(move_probs)
-            for row, col in valid_moves:
-                idx = row * 3 + col
-                valid_move_probs[idx] = move_probs[idx]
-            
-            # Normalize probabilities
-            if valid_move_probs.sum() > 0:
-                valid_move_probs = valid_move_probs / valid_move_probs.sum()
-            else:
-                # Fallback to uniform distribution
-                for row, col in valid_moves:
-                    idx = row * 3 + col
-                    valid_move_probs[idx] = 1.0 / len(valid_moves)
-            
-            # Sample move based on probabilities
-            if temperature > 0:
-                move_idx = torch.multinomial(valid_move_probs, 1).item()
-            else:
-                move_idx = torch.argmax(valid_move_probs).item()
-            
-            return (move_idx // 3, move_idx % 3)
+        if temperature > 0:
+            move_logits = move_logits / temperature + _gumbel_like(move_logits)
+        move_idx = move_logits.argmax(dim=1)
+        
+        return move_idx.cpu().numpy()
+    
+    @staticmethod
+    def choose_move(move_logits, valid_moves: List[Tuple[int, int]],
+                    temperature: float = 1.0) -> Tuple[int, int]:
+        """Pick a valid move from the network's 9 move logits"""
+        # Only the valid squares' logits take part in the choice
+        valid_idx = np.array([row * 3 + col for row, col in valid_moves])
+        logits = np.asarray(move_logits, dtype=np.float64)[valid_idx]
+        
+        if temperature > 0:
+            # Apply temperature for exploration and sample (Gumbel-max, same
+            # distribution as a softmax over the valid moves)
+            logits = logits / temperature + np.random.gumbel(size=len(logits))
+        move_idx = int(valid_idx[np.argmax(logits)])
+        
+        return (move_idx // 3, move_idx % 3)
 
 class TicTacToeAgent:
     """AI Agent that uses the neural network to play Tic-Tac-Toe"""
     
-    def __init__(self, learning_rate=0.001, device='cpu'):
+    def __init__(self, learning_rate=0.001, device='cpu', network: nn.Module = None):
         self.device = device
-        self.network = TicTacToeNet().to(device)
-        self.optimizer = optim.Adam(self.network.parameters(), lr=learning_rate)
+        # A given network (e.g. a self-play worker's shared one) only serves moves:
+        # it is used as-is, without TorchScript, and gets no optimizer
+        self.network = TicTacToeNet().to(device) if network is None else network.eval()
+        # What train_step runs forward/backward through; multi-process training
+        # swaps in a DistributedDataParallel wrapper around self.network
+        self.train_network = self.network
+        self.policy_network = self._compile(self.network) if network is None else self.network
+        self.quantized = False
+        self.optimizer = self._make_optimizer(learning_rate) if network is None else None
         self.criterion = nn.MSELoss()
+        # bf16 mixed precision for training where the hardware runs it natively;
+        # on CPU the casts cost more than they save at these layer sizes, but it
+        # can be switched on by hand (e.g. on CPUs with AMX/AVX512-BF16)
+        self.use_autocast = (torch.device(device).type == 'cuda'
+                             and torch.cuda.is_available() and torch.cuda.is_bf16_supported())
+        
+        # Board bytes -> move logits, LRU; only valid until the weights change
+        self.policy_cache = OrderedDict()
+        # The GUI trains an agent on a worker thread while the Tk thread asks it for moves
+        self._cache_lock = threading.Lock()
+        # (path, mtime) of the checkpoint the weights currently match, if any
+        self.loaded_from = None
         
         # Training statistics
         self.training_history = {
@@ -98,34 +129,140 @@ class TicTacToeAgent:
             'episodes': []
         }
     
+    def _make_optimizer(self, learning_rate: float) -> optim.Optimizer:
+        """Adam that updates all parameter tensors in one fused/foreach kernel"""
+        # fused needs PyTorch >= 2.0 and CUDA tensors; foreach needs >= 1.12
+        fused = {'fused': True} if torch.device(self.device).type == 'cuda' else {'foreach': True}
+        try:
+            return optim.Adam(self.network.parameters(), lr=learning_rate, **fused)
+        except (TypeError, RuntimeError):
+            return optim.Adam(self.network.parameters(), lr=learning_rate)
+    
+    @staticmethod
+    def _compile(network: nn.Module) -> nn.Module:
+        """TorchScript the network for inference, falling back to eager mode"""
+        # The scripted module shares its parameters with the eager one, so
+        # train_step and load_model updates are seen without recompiling
+        try:
+            return torch.jit.script(network).eval()
+        except Exception as e:
+            print(f"⚠️ TorchScript compilation failed, using eager mode: {e}")
+            return network.eval()
+    
+    def quantize(self):
+        """Serve moves from an int8 dynamically quantized copy of the network"""
+        try:
+            self.policy_network = torch.ao.quantization.quantize_dynamic(
+                self.network, {nn.Linear}, dtype=torch.qint8
+            ).eval()
+        except Exception as e:
+            print(f"⚠️ Quantization failed, keeping fp32 inference: {e}")
+            return
+        self.quantized = True
+        self.clear_policy_cache()
+    
     def get_move(self, board_state: np.ndarray, valid_moves: List[Tuple[int, int]], 
                  temperature: float = 0.1) -> Tuple[int, int]:
         """Get the agent's move"""
-        return self.network.predict_move(board_state, valid_moves, temperature)
+        return TicTacToeNet.choose_move(self.policy_logits(board_state), valid_moves, temperature)
+    
+    def get_moves_batch(self, board_states: np.ndarray, valid_masks: np.ndarray,
+                        temperature: float = 0.1) -> np.ndarray:
+        """Get flat move indices for N boards (N, 3, 3) given (N, 9) valid-move masks"""
+        with torch.inference_mode():
+            batch = torch.as_tensor(board_states.reshape(len(board_states), -1),
+                                    dtype=torch.float32, device=self.device)
+            return TicTacToeNet.choose_moves(self.policy_network(batch), valid_masks, temperature)
+    
+    def policy_logits(self, board_state: np.ndarray) -> np.ndarray:
+        """Raw move logits for a board, from the cache when this position was seen before"""
+        key = board_state.tobytes()
+        with self._cache_lock:
+            move_logits = self.policy_cache.get(key)
+            if move_logits is not None:
+                self.policy_cache.move_to_end(key)
+                return move_logits
+        
+        with torch.inference_mode():
+            board_tensor = torch.FloatTensor(board_state.flatten()).unsqueeze(0).to(self.device)
+            move_logits = self.policy_network(board_tensor).squeeze(0).cpu().numpy()
+        self._remember(key, move_logits)
+        return move_logits
+    
+    def _remember(self, key: bytes, move_logits: np.ndarray):
+        """Store logits in the LRU policy cache"""
+        with self._cache_lock:
+            self.policy_cache[key] = move_logits
+            self.policy_cache.move_to_end(key)
+            if len(self.policy_cache) > POLICY_CACHE_SIZE:
+                self.policy_cache.popitem(last=False)
+    
+    def clear_policy_cache(self):
+        """Forget cached logits once the weights change"""
+        with self._cache_lock:
+            self.policy_cache.clear()
     
-    def train_step(self, states: List[np.ndarray], actions: List[int], rewards: List[float]):
-        """Perform one training step"""
-        self.network.train()
+    def warm_policy_cache(self, boards: List[np.ndarray]):
+        """Evaluate the network on many boards in one batched forward pass"""
+        with self._cache_lock:
+            boards = [board for board in boards if board.tobytes() not in self.policy_cache]
+        if not boards:
+            return
         
-        # Convert to tensors
-        state_tensor = torch.FloatTensor(np.array(states)).to(self.device)
-        action_tensor = torch.LongTensor(actions).to(self.device)
-        reward_tensor = torch.FloatTensor(rewards).to(self.device)
+        with torch.inference_mode():
+            batch = torch.FloatTensor(np.stack([board.flatten() for board in boards])).to(self.device)
+            logits = self.policy_network(batch).cpu().numpy()
+        for board, move_logits in zip(boards, logits):
+            self._remember(board.tobytes(), move_logits)
+    
+    def train_step(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                   weights: np.ndarray = None):
+        """Perform one training step, weighting each sample's squared error if weights are given"""
+        self.train_network.train()
         
-        # Forward pass
-        q_values = self.network(state_tensor)
-        q_values_for_actions = q_values.gather(1, action_tensor.unsqueeze(1)).squeeze()
+        # Convert to tensors (zero-copy when already arrays of the right dtype);
+        # states keep their compact int8 boards until they are on the device
+        state_tensor = self._to_device(np.asarray(states)).float()
+        action_tensor = self._to_device(np.asarray(actions, dtype=np.int64))
+        reward_tensor = self._to_device(np.asarray(rewards, dtype=np.float32))
         
-        # Compute loss
-        loss = self.criterion(q_values_for_actions, reward_tensor)
+        with torch.autocast(device_type=torch.device(self.device).type, dtype=torch.bfloat16,
+                            enabled=self.use_autocast):
+            # Forward pass
+            q_values = self.train_network(state_tensor)
+            q_values_for_actions = q_values.gather(1, action_tensor.unsqueeze(1)).squeeze()
+            
+            # Compute loss (autocast runs MSE in fp32)
+            if weights is None:
+                loss = self.criterion(q_values_for_actions, reward_tensor)
+            else:
+                weight_tensor = self._to_device(np.asarray(weights, dtype=np.float32))
+                loss = (weight_tensor * (q_values_for_actions.float() - reward_tensor).pow(2)).mean()
         
         # Backward pass
-        self.optimizer.zero_grad()
+        self.optimizer.zero_grad(set_to_none=True)
         loss.backward()
         self.optimizer.step()
+        self.clear_policy_cache()
+        self.loaded_from = None
+        if self.quantized:
+            # The int8 copy holds the old weights; go back to the shared fp32 network
+            self.policy_network = self._compile(self.network)
+            self.quantized = False
+        else:
+            # The policy network stays in eval mode (it is self.network in eager fallback)
+            self.policy_network.eval()
         
         return loss.item()
     
+    def _to_device(self, array: np.ndarray) -> torch.Tensor:
+        """Wrap a numpy batch as a tensor on the agent's device"""
+        tensor = torch.from_numpy(np.ascontiguousarray(array))
+        if torch.device(self.device).type == 'cuda':
+            # Pinned memory lets the host-to-device copy run asynchronously
+            return tensor.pin_memory().to(self.device, non_blocking=True)
+        return tensor
+    
     def save_model(self, filepath: str):
         """Save the trained model"""
         torch.save({
@@ -136,8 +273,25 @@ class TicTacToeAgent:
     
     def load_model(self, filepath: str):
         """Load a trained model"""
-        checkpoint = torch.load(filepath, map_location=self.device, weights_only=False)
+        # Nothing to do if the weights already match this file and it hasn't changed
+        source = (os.path.abspath(filepath), os.path.getmtime(filepath))
+        if source == self.loaded_from:
+            return
+        
+        try:
+            # Memory-map the tensors instead of reading the whole file up front (PyTorch >= 2.1)
+            checkpoint = torch.load(filepath, map_location=self.device, weights_only=False, mmap=True)
+        except TypeError:
+            # Older PyTorch lacks mmap (and before 1.13 weights_only too); its
+            # default load already unpickles the whole checkpoint
+            checkpoint = torch.load(filepath, map_location=self.device)
+        # Copy into the existing parameters (no assign=True): the optimizer and the
+        # scripted policy network hold references to these tensors
         self.network.load_state_dict(checkpoint['model_state_dict'])
+        self.clear_policy_cache()
+        self.loaded_from = source
+        if self.quantized:
+            self.quantize()
         self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
         self.training_history = checkpoint.get('training_history', {
             'losses': [], 'win_rates': [], 'episodes': []
@@ -149,56 +303,65 @@ class RandomAgent:
     def get_move(self, board_state: np.ndarray, valid_moves: List[Tuple[int, int]]) -> Tuple[int, int]:
         """Get a random valid move"""
         return random.choice(valid_moves)
+    
+    def get_moves_batch(self, board_states: np.ndarray, valid_masks: np.ndarray) -> np.ndarray:
+        """Uniformly random valid flat move index for each of N boards"""
+        # Random scores on the empty squares only; the argmax is a uniform pick among them
+        return np.argmax(np.random.random(valid_masks.shape) * valid_masks, axis=1)
 
 class HeuristicAgent:
     """Heuristic-based agent for medium difficulty"""
     
+    def __init__(self):
+        # Board bytes -> moves the heuristics consider equally good; the random
+        # tie-break still happens per call, so play stays varied
+        self.candidates = {}
+    
     def get_move(self, board_state: np.ndarray, valid_moves: List[Tuple[int, int]]) -> Tuple[int, int]:
         """Get move based on simple heuristics"""
+        key = board_state.tobytes()
+        candidates = self.candidates.get(key)
+        if candidates is None:
+            candidates = self._candidate_moves(board_state, valid_moves)
+            self.candidates[key] = candidates
+        return random.choice(candidates)
+    
+    def get_moves_batch(self, board_states: np.ndarray, valid_masks: np.ndarray) -> np.ndarray:
+        """Heuristic flat move index for each of N boards"""
+        moves = np.empty(len(board_states), dtype=np.int64)
+        for i, (board, mask) in enumerate(zip(board_states, valid_masks)):
+            row, col = self.get_move(board.reshape(3, 3), [divmod(int(sq), 3) for sq in np.flatnonzero(mask)])
+            moves[i] = row * 3 + col
+        return moves
+    
+    def _candidate_moves(self, board_state: np.ndarray, valid_moves: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Best moves by simple heuristics, to be chosen from at random"""
         
-        # Check for winning move
-        for row, col in valid_moves:
-            test_board = board_state.copy()
-            test_board[row, col] = -1  # Assume this agent is O
-            if self._check_win(test_board, -1):
-                return (row, col)
-        
-        # Check for blocking opponent's win
-        for row, col in valid_moves:
-            test_board = board_state.copy()
-            test_board[row, col] = 1  # Assume opponent is X
-            if self._check_win(test_board, 1):
-                return (row, col)
+        # Check for winning move, then for blocking the opponent's win
+        flat = board_state.ravel()
+        o_bb = int(_SQUARE_BITS[flat == -1].sum())  # Assume this agent is O
+        x_bb = int(_SQUARE_BITS[flat == 1].sum())   # Assume opponent is X
+        for player_bb in (o_bb, x_bb):
+            move = self._winning_move(player_bb, valid_moves)
+            if move is not None:
+                return [move]
         
         # Take center if available
         if (1, 1) in valid_moves:
-            return (1, 1)
+            return [(1, 1)]
         
         # Take corners
         corners = [(0, 0), (0, 2), (2, 0), (2, 2)]
         available_corners = [move for move in corners if move in valid_moves]
         if available_corners:
-            return random.choice(available_corners)
+            return available_corners
         
         # Take any remaining move
-        return random.choice(valid_moves)
+        return list(valid_moves)
     
-    def _check_win(self, board: np.ndarray, player: int) -> bool:
-        """Check if the player has won"""
-        # Check rows
-        for row in board:
-            if np.sum(row) == player * 3:
-                return True
-        
-        # Check columns
-        for col in range(3):
-            if np.sum(board[:, col]) == player * 3:
-                return True
-        
-        # Check diagonals
-        if np.sum([board[i, i] for i in range(3)]) == player * 3:
-            return True
-        if np.sum([board[i, 2-i] for i in range(3)]) == player * 3:
-            return True
-        
-        return False 
\ No newline at end of file
+    def _winning_move(self, player_bb: int, valid_moves: List[Tuple[int, int]]):
+        """First valid move that completes a line for the player's bitboard, or None"""
+        for row, col in valid_moves:
+            if IS_WIN[player_bb | 1 << (row * 3 + col)]:
+                return (row, col)
+        return None
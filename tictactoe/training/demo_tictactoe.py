@@ -60,8 +60,9 @@ def demo_agents():
     heuristic_wins = 0
     draws = 0
     
+    game = TicTacToe()
     for _ in range(10):
-        game = TicTacToe()
+        game.reset()
         
         while not game.game_over:
             current_state = game.get_board_state()
@@ -148,6 +149,7 @@ def demo_human_vs_ai_simulation():
     print("(Simulated human moves will be random for demo)")
     game.print_board()
     
+    simulated_human = RandomAgent()
     while not game.game_over:
         current_state = game.get_board_state()
         valid_moves = game.get_valid_moves()
@@ -155,7 +157,7 @@ def demo_human_vs_ai_simulation():
         if (game.current_player == Player.X and human_is_x) or \
            (game.current_player == Player.O and not human_is_x):
             # Simulated human move (random for demo)
-            move = RandomAgent().get_move(current_state, valid_moves)
+            move = simulated_human.get_move(current_state, valid_moves)
             player_name = "Human"
         else:
             # AI move
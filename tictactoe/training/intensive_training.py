@@ -5,14 +5,25 @@ Intensive Training Script for Tic-Tac-Toe Neural Network
 
 import sys
 import os
+import contextlib
 # Add parent directory to path so we can import from the main project
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import logging
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 
-from models.neural_network import TicTacToeAgent
-from training.trainer import TicTacToeTrainer
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+
+# 9->128 layers at batch <= 128 are far too small to split across threads; extra
+# OpenMP threads just wait on barriers. The parallel mode scales with processes instead.
+torch.set_num_threads(1)
+
+from models.neural_network import TicTacToeAgent, TRAINING_DEVICE
+from training.trainer import TicTacToeTrainer, logger as training_logger
 
 def quick_boost_training():
     """Quick training boost for immediate improvement"""
@@ -20,15 +31,15 @@ def quick_boost_training():
     print("⚡ QUICK TRAINING BOOST")
     print("=" * 30)
     
-    agent = TicTacToeAgent(learning_rate=0.003)  # Higher learning rate
+    agent = TicTacToeAgent(learning_rate=0.003, device=TRAINING_DEVICE)  # Higher learning rate
     trainer = TicTacToeTrainer(agent)
     
     # Focused training
     print("🎯 Focused Random Training...")
-    trainer.train_against_random(episodes=500, batch_size=64)
+    trainer.train_against_random(episodes=500, batch_size=64, parallel_games=64)
     
     print("🎯 Focused Self-Play...")
-    trainer.train_self_play(episodes=500, batch_size=64)
+    trainer.train_self_play(episodes=500, batch_size=64, parallel_games=64)
     
     # Quick evaluation
     eval_results = trainer.evaluate_agent("random", 100)
@@ -46,22 +57,22 @@ def intensive_training():
     print("=" * 50)
     
     # Create agent and trainer
-    agent = TicTacToeAgent(learning_rate=0.001)
+    agent = TicTacToeAgent(learning_rate=0.001, device=TRAINING_DEVICE)
     trainer = TicTacToeTrainer(agent)
     
     print("📚 Phase 1: Extended Random Training")
     print("-" * 30)
-    results1 = trainer.train_against_random(episodes=1000, batch_size=32)
+    results1 = trainer.train_against_random(episodes=1000, batch_size=32, parallel_games=64)
     print(f"✅ Phase 1 Complete - Win Rate: {results1['win_rate']:.3f}")
     
     print("\n📚 Phase 2: Extended Self-Play")
     print("-" * 30)
-    results2 = trainer.train_self_play(episodes=1000, batch_size=32)
+    results2 = trainer.train_self_play(episodes=1000, batch_size=32, parallel_games=64)
     print(f"✅ Phase 2 Complete - Win Rate: {results2['win_rate']:.3f}")
     
     print("\n📚 Phase 3: Heuristic Challenge")
     print("-" * 30)
-    results3 = trainer.train_against_heuristic(episodes=500, batch_size=32)
+    results3 = trainer.train_against_heuristic(episodes=500, batch_size=32, parallel_games=64)
     print(f"✅ Phase 3 Complete - Win Rate: {results3['win_rate']:.3f}")
     
     print("\n🎯 FINAL EVALUATION")
@@ -85,14 +96,73 @@ def intensive_training():
     
     return agent, trainer
 
+class DistributedTrainer(TicTacToeTrainer):
+    """Trainer for one rank of data-parallel training"""
+    
+    def _ready_to_train(self, ready: bool) -> bool:
+        """Only train when every rank can, so the gradient all-reduce never waits forever"""
+        flag = torch.tensor([int(ready)])
+        dist.all_reduce(flag, op=dist.ReduceOp.MIN)
+        return bool(flag.item())
+    
+    def wait_for_longer_ranks(self, episodes: int, max_episodes: int):
+        """Answer the training checks of ranks that play more episodes than this one"""
+        # Checks fall on episodes 0, train_every, 2 * train_every, ...; voting "not
+        # ready" in the ones this rank never reaches keeps every all-reduce matched
+        checks = lambda n: -(-n // self.train_every)
+        for _ in range(checks(max_episodes) - checks(episodes)):
+            self._ready_to_train(False)
+
+def _self_play_worker(rank: int, world_size: int, episodes: int, batch_size: int, save_path: str):
+    """One self-play process; DDP averages its gradients with the other ranks"""
+    torch.seed()  # Otherwise every rank samples the same games from the same weights
+    dist.init_process_group(backend="gloo", rank=rank, world_size=world_size)
+    if rank != 0:
+        # Only rank 0 reports progress
+        training_logger.setLevel(logging.WARNING)
+    
+    agent = TicTacToeAgent(learning_rate=0.001)
+    # DDP broadcasts rank 0's initial weights and all-reduces gradients in backward()
+    agent.train_network = DistributedDataParallel(agent.network)
+    trainer = DistributedTrainer(agent)
+    # Spread the remainder over the first ranks so every requested episode is played
+    share = episodes // world_size + (1 if rank < episodes % world_size else 0)
+    longest = -(-episodes // world_size)
+    with open(os.devnull, "w") if rank != 0 else contextlib.nullcontext(sys.stdout) as out, \
+         contextlib.redirect_stdout(out):
+        if share:
+            trainer.train_self_play(episodes=share, batch_size=batch_size, parallel_games=64)
+        trainer.wait_for_longer_ranks(share, longest)
+    
+    if rank == 0:
+        eval_random = trainer.evaluate_agent("random", 200)
+        print(f"📊 vs Random: {eval_random['win_rate']:.1%} wins, {eval_random['draw_rate']:.1%} draws")
+        agent.save_model(save_path)
+        print(f"💾 Model saved as '{save_path}'")
+    dist.destroy_process_group()
+
+def parallel_self_play_training(episodes: int = 8000, batch_size: int = 32, world_size: int = None):
+    """Self-play sharded across CPU cores, one process per core"""
+    world_size = world_size or max(1, (os.cpu_count() or 2) // 2)
+    
+    print(f"🚀 PARALLEL SELF-PLAY ({world_size} processes)")
+    print("=" * 30)
+    
+    os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+    os.environ.setdefault("MASTER_PORT", "29500")
+    mp.spawn(_self_play_worker, args=(world_size, episodes, batch_size,
+                                      "models/parallel_trained_model.pth"),
+             nprocs=world_size, join=True)
+
 def main():
     print("🎯 Choose Training Mode:")
     print("1. Quick Boost (1000 episodes, ~3 minutes)")
     print("2. Intensive Training (2500 episodes, ~8 minutes)")
     print("3. Custom Training")
+    print("4. Parallel Self-Play (all CPU cores)")
     
     try:
-        choice = input("\nEnter choice (1-3): ").strip()
+        choice = input("\nEnter choice (1-4): ").strip()
         
         if choice == "1":
             quick_boost_training()
@@ -100,11 +170,13 @@ def main():
             intensive_training()
         elif choice == "3":
             custom_episodes = int(input("Enter number of episodes: "))
-            agent = TicTacToeAgent()
+            agent = TicTacToeAgent(device=TRAINING_DEVICE)
             trainer = TicTacToeTrainer(agent)
             trainer.train_against_random(episodes=custom_episodes, batch_size=32)
             eval_results = trainer.evaluate_agent("random", 100)
             print(f"Results: {eval_results['win_rate']:.1%} win rate")
+        elif choice == "4":
+            parallel_self_play_training()
         else:
             print("❌ Invalid choice")
             return 1
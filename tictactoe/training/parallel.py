@@ -0,0 +1,65 @@
+import queue
+import torch
+import torch.multiprocessing as mp
+
+from game.tictactoe import Player
+from models.neural_network import TicTacToeAgent, TicTacToeNet
+from training.trainer import TicTacToeTrainer
+
+# Spawn (not fork) so workers never inherit OpenMP/Tk state from the learner process
+_SPAWN = mp.get_context("spawn")
+
+class SelfPlayWorker(_SPAWN.Process):
+    """Plays self-play games with the learner's shared network and queues their outcomes"""
+    
+    def __init__(self, network: TicTacToeNet, episodes: int, parallel_games: int, results):
+        super().__init__(daemon=True)
+        self.network = network
+        self.episodes = episodes
+        self.parallel_games = parallel_games
+        self.results = results
+    
+    def run(self):
+        """Play this worker's share of games in lockstep blocks, one queue item per block"""
+        torch.set_num_threads(1)
+        torch.seed()  # Otherwise every worker samples the same games
+        
+        # Serve moves straight from the shared parameters, which the learner updates in place
+        agent = TicTacToeAgent(device=str(next(self.network.parameters()).device), network=self.network)
+        trainer = TicTacToeTrainer(agent)
+        
+        for first_episode in range(0, self.episodes, self.parallel_games):
+            block = min(self.parallel_games, self.episodes - first_episode)
+            sim, trajectories = trainer._play_lockstep(
+                [{Player.X, Player.O}] * block, {Player.X: 0.5, Player.O: 0.3}
+            )
+            self.results.put([(sim.get_result(i), int(sim.move_count[i]), trajectories[i])
+                              for i in range(block)])
+
+def worker_self_play_games(network: TicTacToeNet, episodes: int, parallel_games: int, workers: int):
+    """Yield (result, length, trajectory) for self-play games played by worker processes"""
+    # Workers read the weights through shared memory, so they always play the latest policy
+    network.share_memory()
+    results = _SPAWN.Queue()
+    shares = [episodes // workers + (1 if w < episodes % workers else 0) for w in range(workers)]
+    processes = [SelfPlayWorker(network, share, parallel_games, results) for share in shares if share]
+    for process in processes:
+        process.start()
+    
+    try:
+        received = 0
+        while received < episodes:
+            try:
+                games = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("Self-play workers exited before finishing their games")
+                continue
+            for game in games:
+                received += 1
+                yield game
+    finally:
+        for process in processes:
+            process.join(timeout=1.0)
+            if process.is_alive():
+                process.terminate()
@@ -1,14 +1,26 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from typing import List, Dict, Tuple
-import random
-from collections import deque
 import time
 import sys
+import logging
 
-from game.tictactoe import TicTacToe, Player, GameResult
+from game.tictactoe import BatchedTicTacToe, Player, GameResult
 from models.neural_network import TicTacToeAgent, RandomAgent, HeuristicAgent
 
+# Training reports go through this logger so other threads (e.g. the GUI) can attach
+# handlers; by default it prints plain messages to stdout like before
+logger = logging.getLogger("tictactoe.training")
+if not logger.handlers:
+    _stdout_handler = logging.StreamHandler(sys.stdout)
+    _stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_stdout_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Training episodes take microseconds once batched, so redraw the progress bar sparingly
+PROGRESS_EVERY = 500
+
 def print_progress_bar(iteration, total, prefix='', suffix='', decimals=1, length=50, fill='█', print_end="\r"):
     """
     Call in a loop to create terminal progress bar
@@ -21,11 +33,65 @@ def print_progress_bar(iteration, total, prefix='', suffix='', decimals=1, lengt
     if iteration == total: 
         print()
 
+class ReplayBuffer:
+    """Fixed-size experience replay stored as preallocated state/action/reward arrays"""
+    
+    def __init__(self, capacity: int = 10000, prioritized: bool = False):
+        self.capacity = capacity
+        self.prioritized = prioritized
+        # Squares are only -1/0/1; the agent upcasts to float after the device copy
+        self.states = np.empty((capacity, 9), dtype=np.int8)
+        self.actions = np.empty(capacity, dtype=np.int64)
+        self.rewards = np.empty(capacity, dtype=np.float32)
+        # Prioritized sampling favors decisive outcomes; the floor keeps zero-reward moves reachable
+        self.priorities = np.zeros(capacity, dtype=np.float32)
+        self.ptr = 0
+        self.size = 0
+        self.rng = np.random.default_rng()
+    
+    def __len__(self):
+        return self.size
+    
+    def add(self, states: List[np.ndarray], actions: List[int], reward: float):
+        """Append one game's transitions, overwriting the oldest once full"""
+        if len(states) == 0:
+            return
+        idx = (self.ptr + np.arange(len(states))) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = reward
+        self.priorities[idx] = abs(reward) + 0.01
+        self.ptr = int(idx[-1] + 1) % self.capacity
+        self.size = min(self.size + len(states), self.capacity)
+    
+    def sample(self, batch_size: int) -> Tuple:
+        """Random batch of distinct transitions as (states, actions, rewards, weights)
+        
+        weights are the importance-sampling corrections for prioritized sampling
+        (normalized so the largest is 1), or None when sampling is uniform.
+        """
+        if not self.prioritized:
+            idx = self.rng.choice(self.size, batch_size, replace=False)
+            return self.states[idx], self.actions[idx], self.rewards[idx], None
+        
+        # Normalize in float64 each time; choice() checks that p sums to 1 tightly
+        probs = self.priorities[:self.size].astype(np.float64)
+        probs /= probs.sum()
+        idx = self.rng.choice(self.size, batch_size, replace=False, p=probs)
+        # Undo the sampling bias toward decisive games: weight each sample by 1 / (N * p)
+        weights = 1.0 / (self.size * probs[idx])
+        return self.states[idx], self.actions[idx], self.rewards[idx], (weights / weights.max()).astype(np.float32)
+
 class TicTacToeTrainer:
     """Training system for the Tic-Tac-Toe neural network"""
     
-    def __init__(self, agent: TicTacToeAgent):
+    def __init__(self, agent: TicTacToeAgent, train_every: int = 10, updates_per_train: int = 1):
         self.agent = agent
+        # Take updates_per_train gradient steps every train_every episodes
+        self.train_every = train_every
+        self.updates_per_train = updates_per_train
+        # One generator for every coin flip, drawn a whole block at a time
+        self.rng = np.random.default_rng()
         self.training_stats = {
             'episodes': [],
             'win_rates': [],
@@ -35,104 +101,190 @@ class TicTacToeTrainer:
             'avg_game_length': []
         }
     
-    def train_against_random(self, episodes: int = 1000, batch_size: int = 32) -> Dict:
+    def train_against_random(self, episodes: int = 1000, batch_size: int = 32,
+                             parallel_games: int = 10) -> Dict:
         """Train the agent against random opponent"""
-        print(f"Training against Random opponent for {episodes} episodes...")
+        logger.info(f"Training against Random opponent for {episodes} episodes...")
         
         opponent = RandomAgent()
-        return self._train_episodes(opponent, episodes, batch_size, "Random")
+        return self._train_episodes(opponent, episodes, batch_size, "Random", parallel_games)
     
-    def train_against_heuristic(self, episodes: int = 1000, batch_size: int = 32) -> Dict:
+    def train_against_heuristic(self, episodes: int = 1000, batch_size: int = 32,
+                                parallel_games: int = 10) -> Dict:
         """Train the agent against heuristic opponent"""
-        print(f"Training against Heuristic opponent for {episodes} episodes...")
+        logger.info(f"Training against Heuristic opponent for {episodes} episodes...")
         
         opponent = HeuristicAgent()
-        return self._train_episodes(opponent, episodes, batch_size, "Heuristic")
+        return self._train_episodes(opponent, episodes, batch_size, "Heuristic", parallel_games)
     
-    def train_self_play(self, episodes: int = 1000, batch_size: int = 32) -> Dict:
-        """Train the agent against itself"""
-        print(f"Training with Self-play for {episodes} episodes...")
+    def train_self_play(self, episodes: int = 1000, batch_size: int = 32,
+                        parallel_games: int = 10, workers: int = 0) -> Dict:
+        """Train the agent against itself, optionally with games played by worker processes"""
+        logger.info(f"Training with Self-play for {episodes} episodes...")
         
-        return self._train_self_play_episodes(episodes, batch_size)
+        return self._train_self_play_episodes(episodes, batch_size, parallel_games, workers=workers)
     
-    def _train_episodes(self, opponent, episodes: int, batch_size: int, opponent_name: str) -> Dict:
+    def run_curriculum(self, phases: List[Dict], prioritized_replay: bool = False) -> List[Dict]:
+        """Run training phases back to back with one replay buffer and one set of opponents
+        
+        Each phase is a dict with 'name', 'opponent' ('random', 'heuristic' or None for
+        self-play), 'episodes', 'batch_size' and optionally 'lr', 'parallel_games' and
+        (self-play only) 'workers'. prioritized_replay samples the shared buffer by
+        reward magnitude, with importance-sampling weights in the loss.
+        """
+        experience_buffer = ReplayBuffer(10000, prioritized=prioritized_replay)
+        opponents = {"random": RandomAgent(), "heuristic": HeuristicAgent()}
+        results = []
+        
+        for number, phase in enumerate(phases, 1):
+            logger.info(f"\nPhase {number}/{len(phases)}: {phase['name']}")
+            if 'lr' in phase:
+                for group in self.agent.optimizer.param_groups:
+                    group['lr'] = phase['lr']
+            
+            parallel_games = phase.get('parallel_games', 10)
+            if phase['opponent'] is None:
+                results.append(self._train_self_play_episodes(
+                    phase['episodes'], phase['batch_size'], parallel_games, experience_buffer,
+                    phase.get('workers', 0)))
+            else:
+                results.append(self._train_episodes(
+                    opponents[phase['opponent']], phase['episodes'], phase['batch_size'],
+                    phase['opponent'].capitalize(), parallel_games, experience_buffer))
+        
+        return results
+    
+    def _ready_to_train(self, ready: bool) -> bool:
+        """Whether to take a training step now; distributed trainers agree across ranks"""
+        return ready
+    
+    def _maybe_train(self, episode: int, experience_buffer: ReplayBuffer, batch_size: int) -> List[float]:
+        """Run the training steps due after this episode and return their losses"""
+        if episode % self.train_every != 0 or \
+           not self._ready_to_train(len(experience_buffer) >= batch_size):
+            return []
+        
+        losses = []
+        for _ in range(self.updates_per_train):
+            batch_states, batch_actions, batch_rewards, weights = experience_buffer.sample(batch_size)
+            losses.append(self.agent.train_step(batch_states, batch_actions, batch_rewards, weights))
+        return losses
+    
+    def _play_lockstep(self, agent_sides: List[set], temperatures: Dict, opponent=None) -> Tuple:
+        """Play one game per entry of agent_sides at once, batching the agent's moves each ply"""
+        n = len(agent_sides)
+        sim = BatchedTicTacToe(n)
+        agent_plays = {player: np.array([player in sides for sides in agent_sides])
+                       for player in (Player.X, Player.O)}
+        # Board before each ply and the square the agent chose there (-1 when it wasn't the agent's move)
+        states = np.zeros((n, 9, 9), dtype=np.int8)
+        actions = np.full((n, 9), -1, dtype=np.int64)
+        
+        for ply in range(9):
+            active = np.flatnonzero(~sim.done)
+            if not active.size:
+                break
+            player = Player.X if ply % 2 == 0 else Player.O  # Every live game is at the same ply
+            boards = sim.boards[active]
+            masks = boards == 0
+            agent_turn = agent_plays[player][active]
+            squares = np.empty(len(active), dtype=np.int64)
+            
+            # One forward pass for every game where it's the agent's turn
+            if agent_turn.any():
+                squares[agent_turn] = self.agent.get_moves_batch(
+                    boards[agent_turn], masks[agent_turn], temperatures[player]
+                )
+                states[active[agent_turn], ply] = boards[agent_turn]
+                actions[active[agent_turn], ply] = squares[agent_turn]
+            if not agent_turn.all():
+                squares[~agent_turn] = opponent.get_moves_batch(boards[~agent_turn], masks[~agent_turn])
+            
+            sim.make_moves(active, squares)
+        
+        # Per game and player: the boards the agent saw and the actions it took
+        plies = np.arange(9)
+        trajectories = []
+        for i in range(n):
+            taken = actions[i] >= 0
+            trajectories.append({
+                player: (states[i, taken & (plies % 2 == parity)], actions[i, taken & (plies % 2 == parity)])
+                for player, parity in ((Player.X, 0), (Player.O, 1))
+            })
+        return sim, trajectories
+    
+    def _self_play_games(self, episodes: int, parallel_games: int):
+        """Yield (result, length, trajectory) for each self-play game, played in lockstep blocks"""
+        for first_episode in range(0, episodes, parallel_games):
+            # Agent plays both sides with different temperatures for variety
+            block = min(parallel_games, episodes - first_episode)
+            sim, trajectories = self._play_lockstep(
+                [{Player.X, Player.O}] * block, {Player.X: 0.5, Player.O: 0.3}
+            )
+            for i in range(block):
+                yield sim.get_result(i), int(sim.move_count[i]), trajectories[i]
+    
+    def _train_episodes(self, opponent, episodes: int, batch_size: int, opponent_name: str,
+                        parallel_games: int = 10, experience_buffer: ReplayBuffer = None) -> Dict:
         """Train for a number of episodes against a specific opponent"""
         
         wins, draws, losses = 0, 0, 0
         total_loss = 0
-        game_lengths = []
-        
-        # Experience replay buffer
-        experience_buffer = deque(maxlen=10000)
-        
-        for episode in range(episodes):
-            # Update progress bar
-            if episode % 10 == 0:
-                print_progress_bar(episode, episodes, 
-                                 prefix=f'{opponent_name} Training:', 
-                                 suffix=f'Episode {episode}/{episodes}')
-            
-            game = TicTacToe()
-            states, actions, rewards = [], [], []
+        updates = 0
+        total_length = 0
+        
+        # Experience replay buffer, carried over from earlier phases in a curriculum
+        if experience_buffer is None:
+            experience_buffer = ReplayBuffer(10000)
+        
+        for first_episode in range(0, episodes, parallel_games):
+            # Randomly choose who goes first in each game of the block
+            agent_players = [Player.X if agent_is_x else Player.O
+                             for agent_is_x in self.rng.random(min(parallel_games, episodes - first_episode)) < 0.5]
+            sim, trajectories = self._play_lockstep(
+                [{player} for player in agent_players], {Player.X: 0.3, Player.O: 0.3}, opponent
+            )
             
-            # Randomly choose who goes first
-            agent_is_x = random.choice([True, False])
-            
-            while not game.game_over:
-                current_state = game.get_board_state()
-                valid_moves = game.get_valid_moves()
+            for i, (episode, trajectory, agent_player) in enumerate(zip(
+                    range(first_episode, episodes), trajectories, agent_players)):
+                # Update progress bar
+                if episode % PROGRESS_EVERY == 0:
+                    print_progress_bar(episode, episodes, 
+                                     prefix=f'{opponent_name} Training:', 
+                                     suffix=f'Episode {episode}/{episodes}')
+                
+                agent_is_x = agent_player == Player.X
+                states, actions = trajectory[agent_player]
                 
-                if (game.current_player == Player.X and agent_is_x) or \
-                   (game.current_player == Player.O and not agent_is_x):
-                    # Agent's turn
-                    move = self.agent.get_move(current_state, valid_moves, temperature=0.3)
-                    action_idx = move[0] * 3 + move[1]
-                    
-                    states.append(current_state.flatten())
-                    actions.append(action_idx)
-                    
+                # Calculate rewards based on game outcome
+                result = sim.get_result(i)
+                total_length += int(sim.move_count[i])
+                
+                if result == GameResult.DRAW:
+                    draws += 1
+                    reward = 0.1  # Small positive reward for draw
+                elif (result == GameResult.X_WINS and agent_is_x) or \
+                     (result == GameResult.O_WINS and not agent_is_x):
+                    wins += 1
+                    reward = 1.0  # Win reward
                 else:
-                    # Opponent's turn
-                    move = opponent.get_move(current_state, valid_moves)
+                    losses += 1
+                    reward = -1.0  # Loss penalty
                 
-                game.make_move(move[0], move[1])
-            
-            # Calculate rewards based on game outcome
-            result = game.get_result()
-            game_lengths.append(game.move_count)
-            
-            if result == GameResult.DRAW:
-                draws += 1
-                reward = 0.1  # Small positive reward for draw
-            elif (result == GameResult.X_WINS and agent_is_x) or \
-                 (result == GameResult.O_WINS and not agent_is_x):
-                wins += 1
-                reward = 1.0  # Win reward
-            else:
-                losses += 1
-                reward = -1.0  # Loss penalty
-            
-            # Assign rewards to all agent moves
-            rewards = [reward] * len(states)
-            
-            # Add experience to buffer
-            for state, action, reward in zip(states, actions, rewards):
-                experience_buffer.append((state, action, reward))
-            
-            # Train on batch
-            if len(experience_buffer) >= batch_size and episode % 10 == 0:
-                batch = random.sample(experience_buffer, batch_size)
-                batch_states, batch_actions, batch_rewards = zip(*batch)
+                # Add experience to buffer, with the game's reward on all agent moves
+                experience_buffer.add(states, actions, reward)
                 
-                loss = self.agent.train_step(list(batch_states), list(batch_actions), list(batch_rewards))
-                total_loss += loss
-            
-            # Log progress
-            if (episode + 1) % 100 == 0:
-                win_rate = wins / (episode + 1)
-                print(f"\nEpisode {episode + 1}/{episodes} - Win Rate: {win_rate:.3f}, "
-                      f"Draw Rate: {draws/(episode + 1):.3f}, "
-                      f"Avg Game Length: {np.mean(game_lengths):.1f}")
+                # Train on batch
+                step_losses = self._maybe_train(episode, experience_buffer, batch_size)
+                total_loss += sum(step_losses)
+                updates += len(step_losses)
+                
+                # Log progress
+                if (episode + 1) % 100 == 0:
+                    win_rate = wins / (episode + 1)
+                    logger.info(f"\nEpisode {episode + 1}/{episodes} - Win Rate: {win_rate:.3f}, "
+                          f"Draw Rate: {draws/(episode + 1):.3f}, "
+                          f"Avg Game Length: {total_length / (episode + 1):.1f}")
         
         # Final progress bar update
         print_progress_bar(episodes, episodes, 
@@ -144,8 +296,8 @@ class TicTacToeTrainer:
         win_rate = wins / total_games
         draw_rate = draws / total_games
         loss_rate = losses / total_games
-        avg_loss = total_loss / max(1, episodes // 10)
-        avg_game_length = np.mean(game_lengths)
+        avg_loss = total_loss / max(1, updates)
+        avg_game_length = total_length / max(1, episodes)
         
         # Update training stats
         self.training_stats['episodes'].append(episodes)
@@ -155,12 +307,12 @@ class TicTacToeTrainer:
         self.training_stats['losses'].append(avg_loss)
         self.training_stats['avg_game_length'].append(avg_game_length)
         
-        print(f"\n{opponent_name} Training Complete!")
-        print(f"Win Rate: {win_rate:.3f}")
-        print(f"Draw Rate: {draw_rate:.3f}")
-        print(f"Loss Rate: {loss_rate:.3f}")
-        print(f"Average Game Length: {avg_game_length:.1f}")
-        print(f"Average Loss: {avg_loss:.4f}")
+        logger.info(f"\n{opponent_name} Training Complete!")
+        logger.info(f"Win Rate: {win_rate:.3f}")
+        logger.info(f"Draw Rate: {draw_rate:.3f}")
+        logger.info(f"Loss Rate: {loss_rate:.3f}")
+        logger.info(f"Average Game Length: {avg_game_length:.1f}")
+        logger.info(f"Average Loss: {avg_loss:.4f}")
         
         return {
             'win_rate': win_rate,
@@ -170,48 +322,38 @@ class TicTacToeTrainer:
             'avg_game_length': avg_game_length
         }
     
-    def _train_self_play_episodes(self, episodes: int, batch_size: int) -> Dict:
+    def _train_self_play_episodes(self, episodes: int, batch_size: int, parallel_games: int = 10,
+                                  experience_buffer: ReplayBuffer = None, workers: int = 0) -> Dict:
         """Train using self-play"""
         
         wins_x, wins_o, draws = 0, 0, 0
         total_loss = 0
-        game_lengths = []
+        updates = 0
+        total_length = 0
         
-        # Experience replay buffer
-        experience_buffer = deque(maxlen=10000)
+        # Experience replay buffer, carried over from earlier phases in a curriculum
+        if experience_buffer is None:
+            experience_buffer = ReplayBuffer(10000)
         
-        for episode in range(episodes):
+        if workers > 0:
+            # Worker processes play with the shared network while this process learns
+            from training.parallel import worker_self_play_games
+            games = worker_self_play_games(self.agent.network, episodes, parallel_games, workers)
+        else:
+            games = self._self_play_games(episodes, parallel_games)
+        
+        for episode, (result, game_length, trajectory) in enumerate(games):
             # Update progress bar
-            if episode % 10 == 0:
+            if episode % PROGRESS_EVERY == 0:
                 print_progress_bar(episode, episodes, 
                                  prefix='Self-Play Training:', 
                                  suffix=f'Episode {episode}/{episodes}')
             
-            game = TicTacToe()
-            states_x, actions_x = [], []
-            states_o, actions_o = [], []
-            
-            while not game.game_over:
-                current_state = game.get_board_state()
-                valid_moves = game.get_valid_moves()
-                
-                # Agent plays both sides with different temperatures for variety
-                if game.current_player == Player.X:
-                    move = self.agent.get_move(current_state, valid_moves, temperature=0.5)
-                    action_idx = move[0] * 3 + move[1]
-                    states_x.append(current_state.flatten())
-                    actions_x.append(action_idx)
-                else:
-                    move = self.agent.get_move(current_state, valid_moves, temperature=0.3)
-                    action_idx = move[0] * 3 + move[1]
-                    states_o.append(current_state.flatten())
-                    actions_o.append(action_idx)
-                
-                game.make_move(move[0], move[1])
+            states_x, actions_x = trajectory[Player.X]
+            states_o, actions_o = trajectory[Player.O]
             
             # Calculate rewards
-            result = game.get_result()
-            game_lengths.append(game.move_count)
+            total_length += game_length
             
             if result == GameResult.DRAW:
                 draws += 1
@@ -224,24 +366,19 @@ class TicTacToeTrainer:
                 reward_x, reward_o = -0.5, 1.0
             
             # Add experiences to buffer
-            for state, action in zip(states_x, actions_x):
-                experience_buffer.append((state, action, reward_x))
-            for state, action in zip(states_o, actions_o):
-                experience_buffer.append((state, action, reward_o))
+            experience_buffer.add(states_x, actions_x, reward_x)
+            experience_buffer.add(states_o, actions_o, reward_o)
             
             # Train on batch
-            if len(experience_buffer) >= batch_size and episode % 10 == 0:
-                batch = random.sample(experience_buffer, batch_size)
-                batch_states, batch_actions, batch_rewards = zip(*batch)
-                
-                loss = self.agent.train_step(list(batch_states), list(batch_actions), list(batch_rewards))
-                total_loss += loss
+            step_losses = self._maybe_train(episode, experience_buffer, batch_size)
+            total_loss += sum(step_losses)
+            updates += len(step_losses)
             
             # Log progress
             if (episode + 1) % 100 == 0:
-                print(f"\nEpisode {episode + 1}/{episodes} - "
+                logger.info(f"\nEpisode {episode + 1}/{episodes} - "
                       f"X Wins: {wins_x}, O Wins: {wins_o}, Draws: {draws}, "
-                      f"Avg Game Length: {np.mean(game_lengths):.1f}")
+                      f"Avg Game Length: {total_length / (episode + 1):.1f}")
         
         # Final progress bar update
         print_progress_bar(episodes, episodes, 
@@ -252,8 +389,8 @@ class TicTacToeTrainer:
         total_games = episodes
         win_rate = (wins_x + wins_o) / (2 * total_games)  # Average win rate
         draw_rate = draws / total_games
-        avg_loss = total_loss / max(1, episodes // 10)
-        avg_game_length = np.mean(game_lengths)
+        avg_loss = total_loss / max(1, updates)
+        avg_game_length = total_length / max(1, episodes)
         
         # Update training stats
         self.training_stats['episodes'].append(episodes)
@@ -263,10 +400,10 @@ class TicTacToeTrainer:
         self.training_stats['losses'].append(avg_loss)
         self.training_stats['avg_game_length'].append(avg_game_length)
         
-        print(f"\nSelf-Play Training Complete!")
-        print(f"X Wins: {wins_x}, O Wins: {wins_o}, Draws: {draws}")
-        print(f"Average Game Length: {avg_game_length:.1f}")
-        print(f"Average Loss: {avg_loss:.4f}")
+        logger.info(f"\nSelf-Play Training Complete!")
+        logger.info(f"X Wins: {wins_x}, O Wins: {wins_o}, Draws: {draws}")
+        logger.info(f"Average Game Length: {avg_game_length:.1f}")
+        logger.info(f"Average Loss: {avg_loss:.4f}")
         
         return {
             'win_rate': win_rate,
@@ -277,7 +414,7 @@ class TicTacToeTrainer:
     
     def evaluate_agent(self, opponent_type: str = "random", games: int = 100) -> Dict:
         """Evaluate the trained agent"""
-        print(f"\nEvaluating agent against {opponent_type} opponent...")
+        logger.info(f"\nEvaluating agent against {opponent_type} opponent...")
         
         if opponent_type == "random":
             opponent = RandomAgent()
@@ -286,38 +423,15 @@ class TicTacToeTrainer:
         else:
             raise ValueError("Unknown opponent type")
         
-        wins, draws, losses = 0, 0, 0
+        # Every game in one lockstep batch, the agent playing greedily
+        agent_is_x = self.rng.random(games) < 0.5
+        sim, _ = self._play_lockstep(
+            [{Player.X} if x else {Player.O} for x in agent_is_x], {Player.X: 0.0, Player.O: 0.0}, opponent
+        )
         
-        for game_num in range(games):
-            # Update progress bar for evaluation
-            if game_num % 10 == 0:
-                print_progress_bar(game_num, games, 
-                                 prefix=f'Evaluating vs {opponent_type}:', 
-                                 suffix=f'Game {game_num}/{games}')
-            
-            game = TicTacToe()
-            agent_is_x = random.choice([True, False])
-            
-            while not game.game_over:
-                current_state = game.get_board_state()
-                valid_moves = game.get_valid_moves()
-                
-                if (game.current_player == Player.X and agent_is_x) or \
-                   (game.current_player == Player.O and not agent_is_x):
-                    move = self.agent.get_move(current_state, valid_moves, temperature=0.0)
-                else:
-                    move = opponent.get_move(current_state, valid_moves)
-                
-                game.make_move(move[0], move[1])
-            
-            result = game.get_result()
-            if result == GameResult.DRAW:
-                draws += 1
-            elif (result == GameResult.X_WINS and agent_is_x) or \
-                 (result == GameResult.O_WINS and not agent_is_x):
-                wins += 1
-            else:
-                losses += 1
+        # Winner times the agent's side is 1 for a win, 0 for a draw and -1 for a loss
+        outcomes = sim.winner * np.where(agent_is_x, Player.X.value, Player.O.value)
+        losses, draws, wins = np.bincount(outcomes + 1, minlength=3).tolist()
         
         # Final progress bar update
         print_progress_bar(games, games, 
@@ -328,10 +442,10 @@ class TicTacToeTrainer:
         draw_rate = draws / games
         loss_rate = losses / games
         
-        print(f"Evaluation Results against {opponent_type}:")
-        print(f"Win Rate: {win_rate:.3f}")
-        print(f"Draw Rate: {draw_rate:.3f}")
-        print(f"Loss Rate: {loss_rate:.3f}")
+        logger.info(f"Evaluation Results against {opponent_type}:")
+        logger.info(f"Win Rate: {win_rate:.3f}")
+        logger.info(f"Draw Rate: {draw_rate:.3f}")
+        logger.info(f"Loss Rate: {loss_rate:.3f}")
         
         return {
             'win_rate': win_rate,
@@ -342,7 +456,7 @@ class TicTacToeTrainer:
     def plot_training_progress(self, save_path: str = None):
         """Plot training progress"""
         if not self.training_stats['episodes']:
-            print("No training data to plot")
+            logger.info("No training data to plot")
             return
         
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
@@ -383,7 +497,7 @@ class TicTacToeTrainer:
         plt.tight_layout()
         
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"Training progress plot saved to {save_path}")
+            plt.savefig(save_path, dpi=150, bbox_inches='tight')
+            logger.info(f"Training progress plot saved to {save_path}")
         
         plt.close()  # Close the figure to prevent display 
\ No newline at end of file
@@ -6,15 +6,23 @@ Target: 80%+ win rate against random opponents
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 # Add parent directory to path so we can import from the main project
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 
-from models.neural_network import TicTacToeAgent
+import torch
+# The network's layers are too small for intra-op threads to pay off
+torch.set_num_threads(1)
+
+from models.neural_network import TicTacToeAgent, TRAINING_DEVICE
 from training.trainer import TicTacToeTrainer
 
+# Self-play phases play their games in worker processes, leaving a core for the learner
+SELF_PLAY_WORKERS = max(0, min(4, (os.cpu_count() or 1) - 1))
+
 def ultra_intensive_training():
     """ULTRA-INTENSIVE training with massive episodes"""
     
@@ -23,44 +31,39 @@ def ultra_intensive_training():
     print("=" * 60)
     
     # Create agent with optimized parameters
-    agent = TicTacToeAgent(learning_rate=0.002)  # Higher learning rate
+    agent = TicTacToeAgent(learning_rate=0.002, device=TRAINING_DEVICE)  # Higher learning rate
     trainer = TicTacToeTrainer(agent)
     
-    print("📚 Phase 1: MASSIVE Random Training")
-    print("-" * 40)
-    results1 = trainer.train_against_random(episodes=5000, batch_size=64)
-    print(f"✅ Phase 1 Complete - Win Rate: {results1['win_rate']:.3f}")
-    
-    print("\n📚 Phase 2: EXTENDED Self-Play")
-    print("-" * 40)
-    results2 = trainer.train_self_play(episodes=3000, batch_size=64)
-    print(f"✅ Phase 2 Complete - Win Rate: {results2['win_rate']:.3f}")
-    
-    print("\n📚 Phase 3: MORE Random Training (Fine-tuning)")
-    print("-" * 40)
-    # Lower learning rate for fine-tuning
-    agent.optimizer.param_groups[0]['lr'] = 0.001
-    results3 = trainer.train_against_random(episodes=3000, batch_size=64)
-    print(f"✅ Phase 3 Complete - Win Rate: {results3['win_rate']:.3f}")
-    
-    print("\n📚 Phase 4: ADVANCED Self-Play")
-    print("-" * 40)
-    results4 = trainer.train_self_play(episodes=2000, batch_size=64)
-    print(f"✅ Phase 4 Complete - Win Rate: {results4['win_rate']:.3f}")
-    
-    print("\n📚 Phase 5: FINAL Random Mastery")
-    print("-" * 40)
-    # Even lower learning rate for precision
-    agent.optimizer.param_groups[0]['lr'] = 0.0005
-    results5 = trainer.train_against_random(episodes=2000, batch_size=64)
-    print(f"✅ Phase 5 Complete - Win Rate: {results5['win_rate']:.3f}")
-    
-    print("\n🎯 ULTRA EVALUATION (500 games each)")
-    print("=" * 40)
-    
-    # Extensive evaluation
-    eval_random = trainer.evaluate_agent("random", 500)
-    eval_heuristic = trainer.evaluate_agent("heuristic", 500)
+    phases = [
+        {"name": "MASSIVE Random Training", "opponent": "random", "episodes": 5000, "batch_size": 64},
+        {"name": "EXTENDED Self-Play", "opponent": None, "episodes": 3000, "batch_size": 64,
+         "workers": SELF_PLAY_WORKERS},
+        # Lower learning rate for fine-tuning
+        {"name": "MORE Random Training (Fine-tuning)", "opponent": "random", "episodes": 3000,
+         "batch_size": 64, "lr": 0.001},
+        {"name": "ADVANCED Self-Play", "opponent": None, "episodes": 2000, "batch_size": 64,
+         "workers": SELF_PLAY_WORKERS},
+        # Even lower learning rate for precision
+        {"name": "FINAL Random Mastery", "opponent": "random", "episodes": 2000,
+         "batch_size": 64, "lr": 0.0005},
+    ]
+    # Sample decisive games more often, with importance weights keeping the loss unbiased
+    phase_results = trainer.run_curriculum(phases, prioritized_replay=True)
+    for number, (phase, results) in enumerate(zip(phases, phase_results), 1):
+        print(f"✅ Phase {number} ({phase['name']}) - Win Rate: {results['win_rate']:.3f}")
+    
+    # Training is over, so the checkpoint and plots are written in the background
+    # while evaluation (which leaves weights and stats untouched) runs
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        saved = executor.submit(agent.save_model, "models/ultra_trained_model.pth")
+        plotted = executor.submit(trainer.plot_training_progress, "ultra_training_progress.png")
+        
+        print("\n🎯 ULTRA EVALUATION (500 games each)")
+        print("=" * 40)
+        
+        # Extensive evaluation
+        eval_random = trainer.evaluate_agent("random", 500)
+        eval_heuristic = trainer.evaluate_agent("heuristic", 500)
     
     print(f"\n🏆 ULTRA RESULTS:")
     print(f"🔥 vs Random: {eval_random['win_rate']:.1%} wins, {eval_random['draw_rate']:.1%} draws")
@@ -73,12 +76,11 @@ def ultra_intensive_training():
         print(f"\n⚠️ Target not reached: {eval_random['win_rate']:.1%} < 80%")
         print("💡 Consider running MEGA training for even better results!")
     
-    # Save the ultra-trained model
-    agent.save_model("models/ultra_trained_model.pth")
+    # Re-raise any error from the background writes
+    saved.result()
     print(f"\n💾 ULTRA Model saved as 'models/ultra_trained_model.pth'")
     
-    # Generate training plots
-    trainer.plot_training_progress("ultra_training_progress.png")
+    plotted.result()
     print(f"📈 ULTRA Training plots saved")
     
     return agent, trainer
@@ -91,37 +93,39 @@ def mega_training():
     print("=" * 60)
     
     # Create agent with even more optimized parameters
-    agent = TicTacToeAgent(learning_rate=0.003)
-    trainer = TicTacToeTrainer(agent)
-    
-    print("📚 MEGA Phase 1: ENORMOUS Random Training")
-    print("-" * 40)
-    results1 = trainer.train_against_random(episodes=10000, batch_size=128)
-    print(f"✅ MEGA Phase 1 Complete - Win Rate: {results1['win_rate']:.3f}")
-    
-    print("\n📚 MEGA Phase 2: MASSIVE Self-Play")
-    print("-" * 40)
-    results2 = trainer.train_self_play(episodes=8000, batch_size=128)
-    print(f"✅ MEGA Phase 2 Complete - Win Rate: {results2['win_rate']:.3f}")
-    
-    print("\n📚 MEGA Phase 3: ULTIMATE Random Mastery")
-    print("-" * 40)
-    agent.optimizer.param_groups[0]['lr'] = 0.001
-    results3 = trainer.train_against_random(episodes=7000, batch_size=128)
-    print(f"✅ MEGA Phase 3 Complete - Win Rate: {results3['win_rate']:.3f}")
-    
-    print("\n🎯 MEGA EVALUATION (1000 games)")
-    print("=" * 40)
-    
-    eval_random = trainer.evaluate_agent("random", 1000)
-    eval_heuristic = trainer.evaluate_agent("heuristic", 1000)
+    agent = TicTacToeAgent(learning_rate=0.003, device=TRAINING_DEVICE)
+    # Every episode's experience feeds 4 updates instead of one update per 10 episodes
+    trainer = TicTacToeTrainer(agent, train_every=1, updates_per_train=4)
+    
+    phases = [
+        {"name": "ENORMOUS Random Training", "opponent": "random", "episodes": 10000, "batch_size": 128},
+        {"name": "MASSIVE Self-Play", "opponent": None, "episodes": 8000, "batch_size": 128,
+         "workers": SELF_PLAY_WORKERS},
+        {"name": "ULTIMATE Random Mastery", "opponent": "random", "episodes": 7000,
+         "batch_size": 128, "lr": 0.001},
+    ]
+    # Sample decisive games more often, with importance weights keeping the loss unbiased
+    phase_results = trainer.run_curriculum(phases, prioritized_replay=True)
+    for number, (phase, results) in enumerate(zip(phases, phase_results), 1):
+        print(f"✅ MEGA Phase {number} ({phase['name']}) - Win Rate: {results['win_rate']:.3f}")
+    
+    # Write the checkpoint and plots while evaluating, as in ULTRA training
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        saved = executor.submit(agent.save_model, "models/mega_trained_model.pth")
+        plotted = executor.submit(trainer.plot_training_progress, "mega_training_progress.png")
+        
+        print("\n🎯 MEGA EVALUATION (1000 games)")
+        print("=" * 40)
+        
+        eval_random = trainer.evaluate_agent("random", 1000)
+        eval_heuristic = trainer.evaluate_agent("heuristic", 1000)
     
     print(f"\n🏆 MEGA RESULTS:")
     print(f"🔥 vs Random: {eval_random['win_rate']:.1%} wins")
     print(f"🛡️ vs Heuristic: {eval_heuristic['win_rate']:.1%} wins, {eval_heuristic['draw_rate']:.1%} draws")
     
-    agent.save_model("models/mega_trained_model.pth")
-    trainer.plot_training_progress("mega_training_progress.png")
+    saved.result()
+    plotted.result()
     print(f"\n💾 MEGA Model saved!")
     
     return agent, trainer
@@ -137,7 +141,7 @@ def custom_intensive_training():
         learning_rate = float(input("Enter learning rate (recommended: 0.002): "))
         batch_size = int(input("Enter batch size (recommended: 64-128): "))
         
-        agent = TicTacToeAgent(learning_rate=learning_rate)
+        agent = TicTacToeAgent(learning_rate=learning_rate, device=TRAINING_DEVICE)
         trainer = TicTacToeTrainer(agent)
         
         # Split training into phases
@@ -181,7 +185,7 @@ def main():
             custom_intensive_training()
         elif choice == "4":
             # Quick test
-            agent = TicTacToeAgent(learning_rate=0.003)
+            agent = TicTacToeAgent(learning_rate=0.003, device=TRAINING_DEVICE)
             trainer = TicTacToeTrainer(agent)
             trainer.train_against_random(episodes=1000, batch_size=64)
             eval_results = trainer.evaluate_agent("random", 200)